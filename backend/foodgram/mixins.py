@@ -0,0 +1,74 @@
+class DenormalizedFieldsMixin:
+    """
+    Модель с денормализованными полями (счётчики, флаги), которые
+    меняются только атомарными UPDATE (recipe.mixins.change_counter).
+    Сохранение загруженного объекта не записывает эти поля: иначе save()
+    вернул бы значения, прочитанные в начале запроса, поверх чужих
+    изменений.
+    """
+
+    denormalized_fields = ()
+
+    def save(self, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+                and field.attname not in deferred
+            ]
+        super().save(**kwargs)
+
+
+class TrackedFieldsMixin:
+    """
+    Запоминает значения полей tracked_fields при загрузке из БД, чтобы
+    обработчики сигналов могли узнать, что изменилось при сохранении.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    def _tracked_value(self, attname):
+        # Для файловых полей — имя файла, а не объект FieldFile.
+        field = self._meta.get_field(attname)
+        return field.get_prep_value(getattr(self, attname))
+
+    def loaded_value(self, attname):
+        """Значение поля при загрузке из БД (None для нового объекта)."""
+        return getattr(self, "_loaded_values", {}).get(attname)
+
+    def changed_fields(self):
+        """Изменённые поля из tracked_fields; для нового объекта — все."""
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return set(self.tracked_fields)
+        return {
+            name
+            for name in self.tracked_fields
+            if name in loaded and self._tracked_value(name) != loaded[name]
+        }
+
+    def save(self, **kwargs):
+        super().save(**kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: self._tracked_value(name)
+            for name in self.tracked_fields
+            if name not in deferred
+        }
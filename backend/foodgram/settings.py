@@ -89,6 +89,31 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram"),
+    }
+}
+# Локальные бэкенды по умолчанию хранят всего 300 ключей, а в кэше лежат
+# версии, ответы, фрагменты рецептов и файлы списков покупок. Клиентам
+# Redis и Memcached OPTIONS передаются как есть, им лимит не нужен.
+if CACHES["default"]["BACKEND"].startswith(
+    (
+        "django.core.cache.backends.locmem.",
+        "django.core.cache.backends.filebased.",
+        "django.core.cache.backends.db.",
+    )
+):
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+    }
+
 AUTH_USER_MODEL = "registration.BaseUser"
 
 # Password validation
@@ -142,6 +167,16 @@ MEDIA_URL = "/media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Медиа именуются по хэшу содержимого, одинаковые файлы не дублируются
+STORAGES = {
+    "default": {
+        "BACKEND": "foodgram.storage.HashedMediaStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
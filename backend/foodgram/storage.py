@@ -0,0 +1,109 @@
+import hashlib
+import os
+import time
+from functools import lru_cache
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import FileField, Q
+
+# Длина имени файла в hex-символах (blake2b, 128 бит).
+HASH_DIGEST_SIZE = 16
+# Файл, сохранённый или переиспользованный за последние столько секунд,
+# release_file не удаляет: запись, которая на него сошлётся, может быть
+# в ещё не закоммиченной транзакции. Такие файлы удалит clean_media.
+RELEASE_MIN_AGE = 60
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    Хранилище медиа с адресацией по содержимому.
+    Файл сохраняется как <upload_to>/ab/cd/<хэш><расширение>; одинаковые
+    загрузки получают одно имя и хранятся один раз. Содержимое файла по
+    такому имени не меняется, поэтому его можно кэшировать бессрочно.
+    Удалять общие файлы следует через release_file.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+
+        digest = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+        if self.exists(name):
+            # Обновлённое время изменения защищает файл от clean_media
+            # и release_file. Если файл успели удалить, он сохраняется
+            # заново.
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass
+            else:
+                return name
+        return super().save(name, content, max_length)
+
+
+@lru_cache(maxsize=None)
+def file_fields():
+    """Модели и их файловые поля в хранилище по умолчанию."""
+    result = []
+    for model in apps.get_models():
+        fields = tuple(
+            field.name
+            for field in model._meta.get_fields()
+            if isinstance(field, FileField)
+            and field.storage is default_storage
+        )
+        if fields:
+            result.append((model, fields))
+    return tuple(result)
+
+
+def count_references(name):
+    """Число записей в БД, ссылающихся на файл name."""
+    references = 0
+    for model, fields in file_fields():
+        query = Q()
+        for field in fields:
+            query |= Q(**{field: name})
+        references += model._default_manager.filter(query).count()
+    return references
+
+
+def referenced_names(names):
+    """Подмножество имён файлов names, на которые ссылаются записи в БД."""
+    referenced = set()
+    for model, fields in file_fields():
+        query = Q()
+        for field in fields:
+            query |= Q(**{f"{field}__in": names})
+        for values in model._default_manager.filter(query).values_list(
+            *fields
+        ):
+            referenced.update(values)
+    return referenced & set(names)
+
+
+def release_file(name, storage=default_storage):
+    """
+    Удаляет файл, если на него больше не ссылается ни одна запись и его
+    не переиспользовали недавно (см. RELEASE_MIN_AGE).
+    """
+    if not name or count_references(name):
+        return
+    try:
+        modified = storage.get_modified_time(name).timestamp()
+    except FileNotFoundError:
+        return
+    if modified < time.time() - RELEASE_MIN_AGE:
+        storage.delete(name)
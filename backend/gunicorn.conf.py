@@ -0,0 +1,26 @@
+"""
+Настройки gunicorn, читаются из рабочего каталога при запуске.
+
+Задачи экспорта PDF (recipe/jobs.py) и версии кэша хранятся в кэше
+Django. Несколько воркеров допустимы только с общим кэшем (Redis из
+docker-compose.production.yml): с кэшем в памяти процесса опрос задачи,
+попавший в другой воркер, не найдёт её. Поэтому без общего кэша
+запускается один воркер.
+"""
+import os
+import sys
+
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+workers = int(os.getenv("GUNICORN_WORKERS", 1))
+if (
+    workers > 1
+    and os.getenv("CACHE_BACKEND", PROCESS_LOCAL_CACHES[0])
+    in PROCESS_LOCAL_CACHES
+):
+    print(
+        f"GUNICORN_WORKERS={workers} требует общего кэша (CACHE_BACKEND), "
+        "запускается один воркер.",
+        file=sys.stderr,
+    )
+    workers = 1
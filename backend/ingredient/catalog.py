@@ -0,0 +1,137 @@
+"""
+Кэш каталога тэгов и ингредиентов в памяти процесса.
+
+Каталог меняется редко, поэтому списки хранятся готовым JSON, а для
+встраивания в рецепты — словари id -> данные. Кэш перестраивается при
+изменении версии каталога (recipe.cache.catalog_stamp), которую
+повышают сигналы сохранения и удаления Tag/Ingredient. Записи в обход
+сигналов (bulk_create, другой процесс без общего кэша) ловит сверка
+с БД: не реже раза в CATALOG_CHECK_INTERVAL секунд снимок сравнивает
+число строк и максимальный id таблиц со своими. При расхождении
+версия каталога повышается, чтобы сбросить и зависящие от неё ответы.
+
+Индекс автодополнения ранжирует ингредиенты по числу рецептов. Оно
+меняется с каждым рецептом, поэтому у него своя версия
+(recipe.cache.ingredient_usage_stamp), а индекс пересчитывает его не
+чаще раза в INGREDIENT_USAGE_REFRESH_INTERVAL секунд.
+"""
+import copy
+import threading
+import time
+
+from django.db.models import Count, Max
+from rest_framework.renderers import JSONRenderer
+
+from recipe.cache import (bump_catalog_version, catalog_stamp,
+                          ingredient_usage_stamp)
+
+from .constants import (CATALOG_CHECK_INTERVAL,
+                        INGREDIENT_USAGE_REFRESH_INTERVAL)
+from .models import Ingredient, Tag
+from .search import IngredientIndex
+from .serializers import ReadOnlyIngredientSerializer, ReadOnlyTagSerializer
+
+
+def catalog_fingerprint():
+    """Число строк и максимальный id тэгов и ингредиентов в БД."""
+    return [
+        list(
+            model.objects.aggregate(count=Count("id"), last=Max("id")).values()
+        )
+        for model in (Tag, Ingredient)
+    ]
+
+
+class Catalog:
+    """Снимок каталога: готовые ответы API и индекс автодополнения."""
+
+    def __init__(self, stamp, usage_stamp):
+        self.stamp = stamp
+        # Отпечаток снимается до чтения строк: запись между ними
+        # приведёт к лишней перестройке, а не к пропущенной.
+        self.fingerprint = catalog_fingerprint()
+        self.checked_at = time.monotonic()
+        tags = ReadOnlyTagSerializer(Tag.objects.all(), many=True).data
+        self.tags = {tag["id"]: tag for tag in tags}
+        self.tags_json = JSONRenderer().render(tags)
+        self.tag_order = {tag["id"]: order for order, tag in enumerate(tags)}
+
+        data = ReadOnlyIngredientSerializer(
+            Ingredient.objects.all(), many=True
+        ).data
+        self.ingredients = {item["id"]: item for item in data}
+        self.ingredients_json = JSONRenderer().render(data)
+        self._build_index(usage_stamp)
+
+    def _build_index(self, usage_stamp):
+        usage = dict(
+            Ingredient.objects.annotate(usage=Count("recipes")).values_list(
+                "id", "usage"
+            )
+        )
+        self.usage_stamp = usage_stamp
+        self.usage_refreshed_at = time.monotonic()
+        self.ingredient_index = IngredientIndex(
+            (item, usage.get(pk, 0)) for pk, item in self.ingredients.items()
+        )
+
+    def with_usage(self, usage_stamp):
+        """Копия каталога с индексом, пересчитанным по текущему usage."""
+        catalog = copy.copy(self)
+        catalog._build_index(usage_stamp)
+        return catalog
+
+    @property
+    def revision(self):
+        """Метка снимка для ETag."""
+        return [self.stamp, self.fingerprint]
+
+    def check_due(self):
+        return time.monotonic() - self.checked_at >= CATALOG_CHECK_INTERVAL
+
+    def usage_outdated(self, usage_stamp):
+        return (
+            self.usage_stamp != usage_stamp
+            and time.monotonic() - self.usage_refreshed_at
+            >= INGREDIENT_USAGE_REFRESH_INTERVAL
+        )
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Каталог текущей версии. Перестраивается при смене версии каталога
+    или расхождении с БД, иначе строится в процессе один раз.
+    """
+    global _catalog
+
+    stamp, usage_stamp = catalog_stamp(), ingredient_usage_stamp()
+    catalog = _catalog
+    if catalog is None or catalog.stamp != stamp:
+        with _lock:
+            if _catalog is None or _catalog.stamp != stamp:
+                _catalog = Catalog(stamp, usage_stamp)
+    elif catalog.check_due():
+        with _lock:
+            if _catalog is catalog:
+                if catalog_fingerprint() != catalog.fingerprint:
+                    bump_catalog_version()
+                    _catalog = Catalog(catalog_stamp(), usage_stamp)
+                else:
+                    catalog.checked_at = time.monotonic()
+
+    if _catalog.usage_outdated(usage_stamp):
+        with _lock:
+            if _catalog.usage_outdated(usage_stamp):
+                _catalog = _catalog.with_usage(usage_stamp)
+    return _catalog
+
+
+def context_catalog(context):
+    """Каталог, запомненный в контексте сериализатора на время запроса."""
+    if "catalog" not in context:
+        context["catalog"] = get_catalog()
+    return context["catalog"]
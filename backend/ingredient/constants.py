@@ -1,3 +1,19 @@
 TAG_LENGTH = 32
 INGREDIENT_NAME_LENGTH = 128
 INGREDIENT_MEASURE_LENGTH = 64
+# Максимум ингредиентов в ответе на поиск по началу названия
+INGREDIENT_SEARCH_LIMIT = 20
+# Автодополнение в памяти (ingredient/search.py): параметр запроса,
+# минимальная длина запроса для поиска с опечатками и длина префиксов
+# с заранее посчитанными результатами
+INGREDIENT_SEARCH_PARAM = "search"
+INGREDIENT_FUZZY_MIN_LENGTH = 3
+INGREDIENT_PREFIX_CACHE_DEPTH = 2
+# Как часто (в секундах) индекс автодополнения пересчитывает число
+# рецептов с ингредиентом после изменения состава рецептов
+INGREDIENT_USAGE_REFRESH_INTERVAL = 60
+# Как часто (в секундах) кэш каталога в памяти процесса сверяется с БД
+# на случай записей в обход сигналов и общего кэша
+CATALOG_CHECK_INTERVAL = 10
+# Размер пачки bulk_create/bulk_update в команде load_ingredients
+INGREDIENT_LOAD_BATCH_SIZE = 1000
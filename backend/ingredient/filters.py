@@ -1,14 +1,15 @@
 import django_filters
+from django.db.models import Case, Count, IntegerField, Value, When
 from django.forms import TextInput
 
+from .constants import INGREDIENT_SEARCH_LIMIT
 from .models import Ingredient
 
 
 class IngredientFilter(django_filters.FilterSet):
     """Фильтр для представления ингредиентов"""
     name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith',
+        method='filter_name',
         widget=TextInput(
             attrs={'placeholder': 'Поиск по названию ингредиента'}
         )
@@ -17,3 +18,18 @@ class IngredientFilter(django_filters.FilterSet):
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        """
+        Поиск по началу названия (индекс ingredient_name_prefix_idx).
+        Сначала точное совпадение, затем самые используемые в рецептах
+        ингредиенты; не больше INGREDIENT_SEARCH_LIMIT результатов.
+        """
+        return queryset.filter(name__istartswith=value).annotate(
+            exact=Case(
+                When(name__iexact=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            usage=Count('recipes'),
+        ).order_by('exact', '-usage', 'name')[:INGREDIENT_SEARCH_LIMIT]
@@ -0,0 +1,77 @@
+import csv
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from ingredient.management.commands.load_ingredients import DEFAULT_PATH
+from ingredient.search import IngredientIndex
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+# Префиксы, слова, другая раскладка, опечатки и запрос без совпадений.
+DEFAULT_QUERIES = (
+    "м", "мо", "мол", "молоко", "топл", "vjkjrj", "малоко", "моолко",
+    "щоколад", "абрикосовое пюре", "zzzzqq",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет автодополнение ингредиентов (ingredient/search.py) на "
+        "синтетическом каталоге: названия из data/ingredients.csv и "
+        "случайные составные названия. БД не используется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000)
+        parser.add_argument("--runs", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "queries",
+            nargs="*",
+            default=DEFAULT_QUERIES,
+            help="Запросы для замера.",
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        with open(DEFAULT_PATH, encoding="utf-8", newline="") as file:
+            base = [row[0] for row in csv.reader(file) if row]
+
+        items = []
+        for number in range(options["size"]):
+            if number < len(base):
+                name = base[number]
+            else:
+                word = "".join(random.choices(LETTERS, k=random.randint(4, 9)))
+                name = f"{random.choice(base).split()[0]} {word}"
+            items.append(
+                (
+                    {"id": number, "name": name, "measurement_unit": "г"},
+                    random.randint(0, 500),
+                )
+            )
+
+        started = time.perf_counter()
+        index = IngredientIndex(items)
+        self.stdout.write(
+            f"Ингредиентов: {len(items)}, построение индекса "
+            f"{time.perf_counter() - started:.2f} с."
+        )
+
+        for query in options["queries"]:
+            index.search(query)
+            timings = []
+            for _ in range(options["runs"]):
+                started = time.perf_counter()
+                results = index.search(query)
+                timings.append(time.perf_counter() - started)
+            top = ", ".join(item["name"] for item in results[:3])
+            self.stdout.write(
+                f"{query!r:20} среднее "
+                f"{statistics.mean(timings) * 1e6:7.1f} мкс, максимум "
+                f"{max(timings) * 1e6:7.1f} мкс, найдено {len(results):2}: "
+                f"{top}"
+            )
@@ -0,0 +1,191 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from ingredient.constants import (INGREDIENT_LOAD_BATCH_SIZE,
+                                  INGREDIENT_MEASURE_LENGTH,
+                                  INGREDIENT_NAME_LENGTH)
+from ingredient.models import Ingredient
+from recipe.cache import bump_catalog_version
+
+DEFAULT_PATH = Path(settings.BASE_DIR) / "data" / "ingredients.csv"
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    """Элементы JSON-массива из файла по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ""):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != "[":
+                    raise CommandError("Ожидался JSON-массив.")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            yield item
+            buffer = buffer[end:]
+
+
+def read_csv(file):
+    """Строки name,measurement_unit без заголовка, как в data/."""
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield None, row[0], row[1]
+
+
+def read_fixture(file):
+    """Фикстура loaddata: сохраняются pk ингредиентов."""
+    for item in iter_json_array(file):
+        if item.get("model", "").lower() != "ingredient.ingredient":
+            continue
+        fields = item.get("fields", {})
+        yield (
+            item.get("pk"),
+            fields.get("name", ""),
+            fields.get("measurement_unit", ""),
+        )
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает ингредиенты из CSV (name,measurement_unit) или фикстуры "
+        "JSON. Повторы по (name, measurement_unit) пропускаются, поэтому "
+        "повторный запуск ничего не меняет."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            default=[str(DEFAULT_PATH)],
+            help="Файлы .csv или .json (по умолчанию data/ingredients.csv).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=INGREDIENT_LOAD_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        # Каталог небольшой: ключи и pk существующих строк в памяти
+        # позволяют обойтись без запроса на каждую строку файла.
+        existing = {}
+        by_pk = {}
+        for pk, name, unit in Ingredient.objects.values_list(
+            "pk", "name", "measurement_unit"
+        ).iterator():
+            existing[(name, unit)] = pk
+            by_pk[pk] = (name, unit)
+
+        inserted = updated = skipped = 0
+        with transaction.atomic():
+            for path in options["paths"]:
+                rows = self._read(Path(path))
+                for batch in batches(rows, options["batch_size"]):
+                    to_create, to_update = [], []
+                    for pk, name, unit in batch:
+                        name, unit = name.strip(), unit.strip()
+                        key = (name, unit)
+                        if (
+                            not name
+                            or not unit
+                            or len(name) > INGREDIENT_NAME_LENGTH
+                            or len(unit) > INGREDIENT_MEASURE_LENGTH
+                            or key in existing
+                        ):
+                            skipped += 1
+                            continue
+                        if pk is not None and pk in by_pk:
+                            # Как loaddata: строка с тем же pk обновляется.
+                            del existing[by_pk[pk]]
+                            by_pk[pk] = key
+                            to_update.append(
+                                Ingredient(
+                                    pk=pk, name=name, measurement_unit=unit
+                                )
+                            )
+                        else:
+                            to_create.append(
+                                Ingredient(
+                                    pk=pk, name=name, measurement_unit=unit
+                                )
+                            )
+                        existing[key] = pk
+
+                    # Строку, вставленную параллельным запуском, защищает
+                    # уникальность (name, measurement_unit): конфликт
+                    # не создаёт повтор, а возвращает её id.
+                    Ingredient.objects.bulk_create(
+                        to_create,
+                        update_conflicts=True,
+                        unique_fields=("name", "measurement_unit"),
+                        update_fields=("measurement_unit",),
+                    )
+                    Ingredient.objects.bulk_update(
+                        to_update, ("name", "measurement_unit")
+                    )
+                    for ingredient in to_create:
+                        key = (ingredient.name, ingredient.measurement_unit)
+                        existing[key] = ingredient.pk
+                        by_pk[ingredient.pk] = key
+                    if any(pk is not None for pk, _, _ in batch):
+                        self._reset_sequence()
+                    inserted += len(to_create)
+                    updated += len(to_update)
+
+            if inserted or updated:
+                # bulk-операции не вызывают сигналы моделей.
+                bump_catalog_version()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Добавлено: {inserted}, обновлено: {updated}, "
+                f"пропущено: {skipped}."
+            )
+        )
+
+    def _read(self, path):
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден.")
+        readers = {".csv": read_csv, ".json": read_fixture}
+        if path.suffix.lower() not in readers:
+            raise CommandError("Поддерживаются файлы .csv и .json.")
+
+        with path.open(encoding="utf-8", newline="") as file:
+            yield from readers[path.suffix.lower()](file)
+
+    def _reset_sequence(self):
+        """Сдвигает последовательность id после вставки с явными pk."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Ingredient]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
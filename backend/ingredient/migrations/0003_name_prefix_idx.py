@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:57
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredient", "0002_auto_20240919_1945"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"),
+                    name="text_pattern_ops",
+                ),
+                name="ingredient_name_prefix_idx",
+            ),
+        ),
+    ]
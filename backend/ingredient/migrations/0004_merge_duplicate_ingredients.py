@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:05
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+# recipe.constants.MAX_WEIGHT на момент миграции.
+MAX_AMOUNT = 32000
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Повторы (name, measurement_unit) сливаются в строку с меньшим id:
+    ссылки рецептов переносятся на неё, количества одного рецепта
+    складываются.
+    """
+    Ingredient = apps.get_model("ingredient", "Ingredient")
+    RecipeIngredient = apps.get_model("recipe", "RecipeIngredient")
+
+    groups = (
+        Ingredient.objects.values("name", "measurement_unit")
+        .annotate(kept=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in groups:
+        kept = group["kept"]
+        duplicates = list(
+            Ingredient.objects.filter(
+                name=group["name"],
+                measurement_unit=group["measurement_unit"],
+            )
+            .exclude(id=kept)
+            .values_list("id", flat=True)
+        )
+        for item in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicates
+        ):
+            target = RecipeIngredient.objects.filter(
+                recipe_id=item.recipe_id, ingredient_id=kept
+            ).first()
+            if target is None:
+                item.ingredient_id = kept
+                item.save(update_fields=["ingredient"])
+            else:
+                target.amount = min(target.amount + item.amount, MAX_AMOUNT)
+                target.save(update_fields=["amount"])
+                item.delete()
+        Ingredient.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredient", "0003_name_prefix_idx"),
+        ("recipe", "0011_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredient", "0004_merge_duplicate_ingredients"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_unit",
+            ),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 from .constants import (INGREDIENT_MEASURE_LENGTH, INGREDIENT_NAME_LENGTH,
                         TAG_LENGTH)
@@ -46,6 +48,20 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "measurement_unit"],
+                name="unique_ingredient_name_unit",
+            ),
+        ]
+        indexes = [
+            # name__istartswith -> UPPER(name) LIKE 'X%', индекс по тому
+            # же выражению с text_pattern_ops поддерживает поиск префикса.
+            models.Index(
+                OpClass(Upper("name"), name="text_pattern_ops"),
+                name="ingredient_name_prefix_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
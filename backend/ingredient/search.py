@@ -0,0 +1,199 @@
+"""
+Автодополнение ингредиентов в памяти процесса.
+
+Индекс входит в кэш каталога (catalog.py) и перестраивается вместе с ним
+при изменении версии каталога или числа рецептов с ингредиентами. Поиск
+не обращается к БД: в индексе хранятся готовые данные ответа. Запрос
+нормализуется: регистр, пробелы и «ё» не различаются.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from .constants import (INGREDIENT_FUZZY_MIN_LENGTH,
+                        INGREDIENT_PREFIX_CACHE_DEPTH, INGREDIENT_SEARCH_LIMIT)
+
+# Одна и та же клавиша в раскладках ЙЦУКЕН и QWERTY.
+LATIN_KEYS = "`qwertyuiop[]asdfghjkl;'zxcvbnm,."
+CYRILLIC_KEYS = "ёйцукенгшщзхъфывапролджэячсмитьбю"
+TO_CYRILLIC = str.maketrans(LATIN_KEYS, CYRILLIC_KEYS)
+TO_LATIN = str.maketrans(CYRILLIC_KEYS, LATIN_KEYS)
+
+# Больше этого символа нет ни в одном ключе: граница диапазона префикса.
+MAX_CHAR = "\U0010ffff"
+
+
+def normalize(text):
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def has_prefix(keys, prefix):
+    """Есть ли в отсортированном списке keys ключ, начинающийся с prefix."""
+    position = bisect_left(keys, prefix)
+    return position < len(keys) and keys[position].startswith(prefix)
+
+
+def next_chars(keys, prefix):
+    """Буквы, которыми prefix продолжается в отсортированном списке keys."""
+    chars = []
+    depth = len(prefix)
+    position = bisect_left(keys, prefix)
+    while position < len(keys) and keys[position].startswith(prefix):
+        key = keys[position]
+        if len(key) > depth and key[depth].isalpha():
+            chars.append(key[depth])
+        if len(key) == depth:
+            position += 1
+        else:
+            position = bisect_left(
+                keys, prefix + key[depth] + MAX_CHAR, position
+            )
+    return chars
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив ключей: все ключи с общим префиксом лежат
+    подряд, поэтому поиск префикса — бинарный поиск (компактная замена
+    дерева префиксов). Лучшие результаты для коротких префиксов посчитаны
+    заранее; для длинного диапазона дешевле перебрать ранги по порядку.
+    """
+
+    def __init__(self, entries, size, limit):
+        """entries — пары (ключ, ранг), size — число рангов."""
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ranks = [rank for _, rank in entries]
+        self.limit = limit
+
+        self.rank_keys = [[] for _ in range(size)]
+        top = {}
+        for key, rank in entries:
+            self.rank_keys[rank].append(key)
+            for length in range(
+                1, min(len(key), INGREDIENT_PREFIX_CACHE_DEPTH) + 1
+            ):
+                top.setdefault(key[:length], set()).add(rank)
+        self.top = {
+            prefix: heapq.nsmallest(limit, ranks)
+            for prefix, ranks in top.items()
+        }
+
+    def search(self, prefix):
+        """Лучшие ранги (меньше — лучше) ключей, начинающихся с prefix."""
+        if len(prefix) <= INGREDIENT_PREFIX_CACHE_DEPTH:
+            return self.top.get(prefix, [])
+        low = bisect_left(self.keys, prefix)
+        high = bisect_right(self.keys, prefix + MAX_CHAR, low)
+        # Перебор диапазона стоит high - low, перебор рангов по порядку —
+        # около limit * size / (high - low) проверок.
+        if (high - low) ** 2 <= self.limit * len(self.rank_keys):
+            return heapq.nsmallest(self.limit, set(self.ranks[low:high]))
+        matches = (
+            rank
+            for rank, keys in enumerate(self.rank_keys)
+            if any(key.startswith(prefix) for key in keys)
+        )
+        return list(islice(matches, self.limit))
+
+
+class IngredientIndex:
+    """
+    Индекс для автодополнения. Порядок результатов: совпадение начала
+    названия, затем начала слова в названии, затем то же для запроса в
+    другой раскладке клавиатуры, затем запросы с одной опечаткой
+    (расстояние Дамерау-Левенштейна 1). Внутри группы — по числу
+    рецептов с ингредиентом, затем по названию.
+    """
+
+    def __init__(self, items, limit=INGREDIENT_SEARCH_LIMIT):
+        """
+        items — пары (данные ингредиента для ответа, число рецептов);
+        в данных обязательно поле name.
+        """
+        items = sorted(items, key=lambda item: (-item[1], item[0]["name"]))
+        self.items = [data for data, _ in items]
+        self.limit = limit
+
+        names, words = [], []
+        for rank, data in enumerate(self.items):
+            key = normalize(data["name"])
+            names.append((key, rank))
+            words.extend(
+                (key[position + 1:], rank)
+                for position, char in enumerate(key)
+                if char == " "
+            )
+        self.keys = sorted(key for key, _ in names + words)
+        self.first_chars = next_chars(self.keys, "")
+        self.indexes = (
+            PrefixIndex(names, len(items), limit),
+            PrefixIndex(words, len(items), limit),
+        )
+
+    def _matches(self, prefix):
+        return [
+            rank for index in self.indexes for rank in index.search(prefix)
+        ]
+
+    def _typos(self, query):
+        """
+        Варианты запроса с одной правкой, которые начинают хоть один ключ.
+        Правка возможна только пока начало запроса есть в индексе, а
+        вставляются и заменяются только буквы, продолжающие это начало.
+        """
+        variants = set()
+        for position in range(len(query) + 1):
+            left, right = query[:position], query[position:]
+            if not has_prefix(self.keys, left):
+                break
+            chars = next_chars(self.keys, left) if left else self.first_chars
+            if right:
+                # Вставка в конец ничего не добавляет к поиску префикса.
+                variants.update(left + char + right for char in chars)
+                variants.add(left + right[1:])
+                variants.update(
+                    left + char + right[1:]
+                    for char in chars
+                    if char != right[0]
+                )
+            if len(right) > 1:
+                variants.add(left + right[1] + right[0] + right[2:])
+        return [
+            variant for variant in variants if has_prefix(self.keys, variant)
+        ]
+
+    def _fuzzy(self, query):
+        typos = self._typos(query)
+        return [
+            rank
+            for index in self.indexes
+            for rank in heapq.nsmallest(
+                self.limit,
+                {rank for typo in typos for rank in index.search(typo)},
+            )
+        ]
+
+    def _results(self, groups):
+        found = {}
+        for group in groups:
+            for rank in group():
+                found.setdefault(rank, None)
+                if len(found) == self.limit:
+                    return [self.items[rank] for rank in found]
+        return [self.items[rank] for rank in found]
+
+    def search(self, query):
+        query = normalize(query)
+        if not query:
+            return []
+
+        groups = [
+            lambda: self._matches(query),
+            lambda: self._matches(normalize(query.translate(TO_CYRILLIC))),
+            lambda: self._matches(normalize(query.translate(TO_LATIN))),
+        ]
+        if len(query) >= INGREDIENT_FUZZY_MIN_LENGTH:
+            groups.append(lambda: self._fuzzy(query))
+
+        return self._results(groups)
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe, RecipeIngredient
+from registration.models import BaseUser
+
+from .models import Ingredient, Tag
+
+
+class CatalogSearchTests(APITestCase):
+    """Параметр ?search= относится только к ингредиентам."""
+
+    def setUp(self):
+        # Версии каталога повышаются после коммита, которого в тестах нет.
+        cache.clear()
+        Tag.objects.create(name="Завтрак", slug="breakfast")
+        Ingredient.objects.create(name="молоко", measurement_unit="мл")
+
+    def test_tags_ignore_search(self):
+        response = self.client.get("/api/tags/", {"search": "мол"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag["slug"] for tag in response.json()], ["breakfast"]
+        )
+
+    def test_ingredients_search(self):
+        response = self.client.get("/api/ingredients/", {"search": "мол"})
+        self.assertEqual(
+            [item["name"] for item in response.json()], ["молоко"]
+        )
+
+
+class IngredientRankingTests(APITestCase):
+    """Ранжирование по числу рецептов и семантика ?name=."""
+
+    def setUp(self):
+        cache.clear()
+        self.flour = Ingredient.objects.create(
+            name="мука", measurement_unit="г"
+        )
+        self.nutmeg = Ingredient.objects.create(
+            name="мускат", measurement_unit="г"
+        )
+        Ingredient.objects.create(name="мёд", measurement_unit="г")
+        self.author = BaseUser.objects.create_user(
+            username="author", email="author@example.com", password="!"
+        )
+
+    def names(self, **params):
+        response = self.client.get("/api/ingredients/", params)
+        return [item["name"] for item in response.json()]
+
+    def use(self, ingredient):
+        recipe = Recipe.objects.create(
+            name="рецепт", text="", cooking_time=1, author=self.author
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1
+            )
+
+    @mock.patch("ingredient.catalog.INGREDIENT_USAGE_REFRESH_INTERVAL", 0)
+    def test_search_ranking_follows_usage(self):
+        self.assertEqual(self.names(search="му"), ["мука", "мускат"])
+        self.use(self.nutmeg)
+        self.assertEqual(self.names(search="му"), ["мускат", "мука"])
+
+    def test_name_filter_reads_database(self):
+        self.use(self.nutmeg)
+        self.assertEqual(self.names(name="му"), ["мускат", "мука"])
+        # ?name= сохраняет семантику БД: «е» и «ё» различаются.
+        self.assertEqual(self.names(name="мед"), [])
+        self.assertEqual(self.names(search="мед"), ["мёд"])
+
+
+@mock.patch("ingredient.catalog.CATALOG_CHECK_INTERVAL", 0)
+class CatalogFreshnessTests(APITestCase):
+    """Каталог видит строки, записанные в обход сигналов."""
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name="Завтрак", slug="breakfast")
+        Ingredient.objects.create(name="молоко", measurement_unit="мл")
+
+    def test_list_sees_bulk_created_rows(self):
+        etag = self.client.get("/api/ingredients/")["ETag"]
+        self.client.get("/api/tags/")
+        # bulk_create не отправляет сигналы и не повышает версию каталога.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name="сахар", measurement_unit="г")]
+        )
+        Tag.objects.bulk_create([Tag(name="Обед", slug="lunch")])
+
+        response = self.client.get(
+            "/api/ingredients/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["name"] for item in response.json()], ["молоко", "сахар"]
+        )
+        sugar = Ingredient.objects.get(name="сахар")
+        response = self.client.get(f"/api/ingredients/{sugar.pk}/")
+        self.assertEqual(response.status_code, 200)
+        tags = self.client.get("/api/tags/").json()
+        self.assertEqual(
+            sorted(tag["slug"] for tag in tags), ["breakfast", "lunch"]
+        )
@@ -1,22 +1,104 @@
+from django.http import Http404, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from recipe.cache import ingredient_usage_stamp
+from registration.utils import ConditionalGetMixin
+
+from .catalog import get_catalog
+from .constants import INGREDIENT_SEARCH_PARAM
 from .filters import IngredientFilter
 from .models import Ingredient, Tag
 from .serializers import ReadOnlyIngredientSerializer, ReadOnlyTagSerializer
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class CatalogViewSetMixin(ConditionalGetMixin):
+    """
+    Чтение каталога из кэша в памяти процесса (см. catalog.py) без
+    обращения к БД и сериализации на каждый запрос.
+    """
+
+    def get_etag_stamp(self, request, *args, **kwargs):
+        return get_catalog().revision
+
+    def catalog_list(self, content, data):
+        """Готовый JSON, если клиент принимает JSON."""
+        if self.request.accepted_renderer.format == "json":
+            return HttpResponse(content, content_type="application/json")
+        return Response(data)
+
+    def catalog_item(self, items, pk):
+        try:
+            return Response(items[int(pk)])
+        except (KeyError, ValueError):
+            raise Http404
+
+
+class TagViewSet(CatalogViewSetMixin, ReadOnlyModelViewSet):
     """Вьюсет для чтения тэгов."""
 
     queryset = Tag.objects.all()
     serializer_class = ReadOnlyTagSerializer
 
+    def _list(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        return self.catalog_list(
+            catalog.tags_json, list(catalog.tags.values())
+        )
+
+    def _retrieve(self, request, *args, **kwargs):
+        return self.catalog_item(get_catalog().tags, kwargs["pk"])
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self._list, request, *args, **kwargs)
 
-class IngredientViewSet(ReadOnlyModelViewSet):
-    """Вьюсет для чтения ингредиентов."""
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self._retrieve, request, *args, **kwargs)
+
+
+class IngredientViewSet(CatalogViewSetMixin, ReadOnlyModelViewSet):
+    """
+    Вьюсет для чтения ингредиентов.
+    ?name= — поиск по началу названия в БД (IngredientFilter),
+    ?search= — автодополнение с учётом опечаток и неверной раскладки
+    клавиатуры по индексу в памяти (см. search.py).
+    """
 
     queryset = Ingredient.objects.all()
     serializer_class = ReadOnlyIngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+
+    def get_etag_stamp(self, request, *args, **kwargs):
+        # Результаты поиска ранжируются по числу рецептов с ингредиентом.
+        if INGREDIENT_SEARCH_PARAM in request.query_params:
+            catalog = get_catalog()
+            return [catalog.revision, catalog.usage_stamp]
+        if request.query_params.get("name"):
+            return [get_catalog().revision, ingredient_usage_stamp()]
+        return super().get_etag_stamp(request, *args, **kwargs)
+
+    def _list(self, request, *args, **kwargs):
+        if INGREDIENT_SEARCH_PARAM in request.query_params:
+            return Response(
+                get_catalog().ingredient_index.search(
+                    request.query_params[INGREDIENT_SEARCH_PARAM]
+                )
+            )
+        if request.query_params.get("name"):
+            queryset = self.filter_queryset(self.get_queryset())
+            return Response(self.get_serializer(queryset, many=True).data)
+        catalog = get_catalog()
+        return self.catalog_list(
+            catalog.ingredients_json, list(catalog.ingredients.values())
+        )
+
+    def _retrieve(self, request, *args, **kwargs):
+        return self.catalog_item(get_catalog().ingredients, kwargs["pk"])
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self._list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self._retrieve, request, *args, **kwargs)
@@ -17,7 +17,14 @@ class RecipeAdmin(admin.ModelAdmin):
     """Модель рецептов в админке"""
 
     model = Recipe
-    list_display = ("name", "author", "is_favorited", "is_in_cart")
+    list_display = (
+        "name",
+        "author",
+        "is_favorited",
+        "is_in_cart",
+        "favorites_count",
+        "baskets_count",
+    )
     search_fields = ("name", "author__username")
     list_filter = ("tags",)
     fields = (
@@ -26,40 +33,25 @@ class RecipeAdmin(admin.ModelAdmin):
         "cooking_time",
         "text",
         "image",
-        "favorite_count",
-        "basket_count",
+        "favorites_count",
+        "baskets_count",
     )
-    readonly_fields = ("favorite_count", "basket_count")
+    readonly_fields = ("favorites_count", "baskets_count")
     inlines = [RecipeTagInline, RecipeIngredientInline]
 
     def is_favorited(self, obj):
-        return obj.favorite.exists()
+        return obj.favorites_count > 0
 
     is_favorited.boolean = True
     is_favorited.short_description = "В избранном"
+    is_favorited.admin_order_field = "favorites_count"
 
     def is_in_cart(self, obj):
-        return obj.shopping_cart.exists()
+        return obj.baskets_count > 0
 
     is_in_cart.boolean = True
     is_in_cart.short_description = "В корзине"
-
-    def favorite_count(self, obj):
-        """
-        Возвращает общее количество пользователей,
-        добавивших рецепт в избранное.
-        """
-        return obj.favorite.count()
-
-    favorite_count.short_description = "Количество в избранном"
-
-    def basket_count(self, obj):
-        """
-        Возвращает общее количество пользователей, добавивших рецепт в корзину.
-        """
-        return obj.shopping_cart.count()
-
-    basket_count.short_description = "Количество в корзине"
+    is_in_cart.admin_order_field = "baskets_count"
 
 
 class FavoriteAdmin(admin.ModelAdmin):
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "recipe"
+
+    def ready(self):
+        from reportlab.pdfbase.ttfonts import TTFError
+
+        from . import checks, signals  # noqa: F401
+        from .rendering import register_pdf_font
+
+        # Шрифт для PDF регистрируется один раз при старте процесса.
+        # Без шрифта (например, локально) приложение всё равно стартует,
+        # а ошибка возникнет только при скачивании PDF.
+        try:
+            register_pdf_font()
+        except TTFError:
+            pass
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import constants
+
+RECIPES_VERSION_KEY = "recipes:version"
+AUTHOR_VERSION_KEY = "recipes:version:author:{author_id}"
+RECIPE_VERSION_KEY = "recipes:version:recipe:{recipe_id}"
+CATALOG_VERSION_KEY = "recipes:version:catalog"
+INGREDIENT_USAGE_VERSION_KEY = "recipes:version:ingredient_usage"
+USERS_VERSION_KEY = "users:version"
+USER_STATE_VERSION_KEY = "users:version:state:{user_id}"
+CART_VERSION_KEY = "shopping_list:version:{user_id}"
+RESPONSE_KEY = "recipes:response:{digest}"
+SHOPPING_LIST_KEY = "shopping_list:artifact:{user_id}:{format}"
+FRAGMENT_KEY = "recipes:fragment:{recipe_id}:{digest}"
+
+
+def _new_version():
+    """
+    Начальное значение версии. Берём время, а не 0, чтобы после вытеснения
+    ключа версии из кэша не совпасть с уже использованной версией.
+    """
+    return time.time_ns()
+
+
+def get_version(key):
+    """Возвращает текущую версию по ключу, создавая её при отсутствии."""
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(keys):
+    """Версии по списку ключей за одно обращение к кэшу."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = get_version(key)
+    return versions
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def bump_recipes_version(author_id=None, recipe_id=None):
+    """
+    Инвалидирует закэшированные ответы рецептов: общую версию и,
+    если переданы, версию рецептов автора и версию фрагмента рецепта.
+    Выполняется после коммита транзакции.
+    """
+
+    def bump():
+        _increment(RECIPES_VERSION_KEY)
+        if author_id is not None:
+            _increment(AUTHOR_VERSION_KEY.format(author_id=author_id))
+        if recipe_id is not None:
+            _increment(RECIPE_VERSION_KEY.format(recipe_id=recipe_id))
+
+    transaction.on_commit(bump)
+
+
+def bump_catalog_version():
+    """Инвалидирует ответы, в которые встроены тэги и ингредиенты."""
+    transaction.on_commit(lambda: _increment(CATALOG_VERSION_KEY))
+
+
+def bump_ingredient_usage_version():
+    """Изменился состав ингредиентов рецептов: их число использований."""
+    transaction.on_commit(lambda: _increment(INGREDIENT_USAGE_VERSION_KEY))
+
+
+def bump_users_version():
+    """Инвалидирует метки профилей пользователей."""
+    transaction.on_commit(lambda: _increment(USERS_VERSION_KEY))
+
+
+def bump_user_state_version(user_id):
+    """
+    Изменились избранное, корзина или подписки пользователя,
+    то есть его флаги is_favorited/is_in_shopping_cart/is_subscribed.
+    """
+    transaction.on_commit(
+        lambda: _increment(USER_STATE_VERSION_KEY.format(user_id=user_id))
+    )
+
+
+def bump_cart_version(user_id):
+    """Пользователь добавил/удалил рецепт из корзины."""
+    transaction.on_commit(
+        lambda: _increment(CART_VERSION_KEY.format(user_id=user_id))
+    )
+
+
+def shopping_list_stamp(user, recipe_ids, export_format):
+    """
+    Метка списка покупок: версия корзины пользователя, версии рецептов
+    в корзине (меняются при правке их ингредиентов) и каталога.
+    Используется как ETag и для проверки сохранённого файла.
+    """
+    keys = [RECIPE_VERSION_KEY.format(recipe_id=pk) for pk in recipe_ids]
+    keys += [CART_VERSION_KEY.format(user_id=user.pk), CATALOG_VERSION_KEY]
+    versions = get_versions(keys)
+    raw_stamp = json.dumps(
+        [export_format, user.username, [versions[key] for key in keys]]
+    )
+    return hashlib.md5(raw_stamp.encode()).hexdigest()
+
+
+def get_shopping_list_artifact(user_id, export_format, stamp):
+    """Сохранённый файл списка покупок, если он актуален для stamp."""
+    artifact = cache.get(
+        SHOPPING_LIST_KEY.format(user_id=user_id, format=export_format)
+    )
+    if artifact is not None and artifact["stamp"] == stamp:
+        return artifact["content"]
+    return None
+
+
+def set_shopping_list_artifact(user_id, export_format, stamp, content):
+    """
+    Сохраняет файл списка покупок. Ключ не зависит от версии, поэтому
+    новый файл вытесняет устаревший: в кэше не больше одного файла на
+    пользователя и формат, остальное вытесняется бэкендом кэша (LRU).
+    """
+    if len(content) > constants.SHOPPING_LIST_MAX_CACHED_SIZE:
+        return
+    cache.set(
+        SHOPPING_LIST_KEY.format(user_id=user_id, format=export_format),
+        {"stamp": stamp, "content": content},
+        constants.SHOPPING_LIST_CACHE_TIMEOUT,
+    )
+
+
+def _user_state_stamp(request):
+    if request.user.is_anonymous:
+        return None
+    return get_version(USER_STATE_VERSION_KEY.format(user_id=request.user.pk))
+
+
+def catalog_stamp():
+    """Метка изменения каталога тэгов и ингредиентов."""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def ingredient_usage_stamp():
+    """Метка изменения числа рецептов с каждым ингредиентом."""
+    return get_version(INGREDIENT_USAGE_VERSION_KEY)
+
+
+def users_stamp(request):
+    """Метка для ETag профилей пользователей."""
+    return [get_version(USERS_VERSION_KEY), _user_state_stamp(request)]
+
+
+def recipes_stamp(request):
+    """
+    Метка для ETag рецептов: версии рецептов, каталога и
+    флагов текущего пользователя.
+    """
+    return [
+        get_version(RECIPES_VERSION_KEY),
+        catalog_stamp(),
+        _user_state_stamp(request),
+    ]
+
+
+def _base_url(request):
+    """
+    Схема и хост запроса: в ответах абсолютные URL картинок, поэтому
+    ответы по http и https кэшируются раздельно.
+    """
+    return request.build_absolute_uri("/")
+
+
+def recipes_response_key(request, pk=None):
+    """
+    Ключ кэша ответа на GET recipes/ и recipes/{pk}/.
+    Параметры запроса нормализуются (сортировка ключей и значений).
+    Список, отфильтрованный по одному автору, зависит только от версии
+    этого автора, остальные ответы - от общей версии рецептов.
+    """
+    query_params = sorted(
+        (param, sorted(values))
+        for param, values in request.query_params.lists()
+    )
+    authors = request.query_params.getlist("author")
+
+    if pk is None and len(authors) == 1 and authors[0].isdigit():
+        scope_version = get_version(
+            AUTHOR_VERSION_KEY.format(author_id=int(authors[0]))
+        )
+    else:
+        scope_version = get_version(RECIPES_VERSION_KEY)
+
+    raw_key = json.dumps(
+        [
+            _base_url(request),
+            pk,
+            query_params,
+            scope_version,
+            get_version(CATALOG_VERSION_KEY),
+        ]
+    )
+    return RESPONSE_KEY.format(
+        digest=hashlib.md5(raw_key.encode()).hexdigest()
+    )
+
+
+def get_recipe_fragments(request, recipes, render):
+    """
+    Возвращает сериализованные рецепты без флагов текущего пользователя.
+    Фрагмент зависит от версии рецепта, его автора и каталога, поэтому
+    общий для всех пользователей. Отсутствующие в кэше фрагменты
+    строятся одним вызовом render(recipe_ids) -> {id: data}.
+    """
+    base_url = _base_url(request)
+    version_keys = {
+        recipe.pk: (
+            RECIPE_VERSION_KEY.format(recipe_id=recipe.pk),
+            AUTHOR_VERSION_KEY.format(author_id=recipe.author_id),
+        )
+        for recipe in recipes
+    }
+    versions = get_versions(
+        [key for keys in version_keys.values() for key in keys]
+        + [CATALOG_VERSION_KEY]
+    )
+
+    fragment_keys = {}
+    for recipe_id, (recipe_key, author_key) in version_keys.items():
+        raw_key = json.dumps(
+            [
+                base_url,
+                versions[recipe_key],
+                versions[author_key],
+                versions[CATALOG_VERSION_KEY],
+            ]
+        )
+        fragment_keys[recipe_id] = FRAGMENT_KEY.format(
+            recipe_id=recipe_id,
+            digest=hashlib.md5(raw_key.encode()).hexdigest(),
+        )
+
+    fragments = cache.get_many(list(fragment_keys.values()))
+    missing = [
+        recipe_id
+        for recipe_id, key in fragment_keys.items()
+        if key not in fragments
+    ]
+    if missing:
+        rendered = {
+            fragment_keys[recipe_id]: data
+            for recipe_id, data in render(missing).items()
+        }
+        cache.set_many(rendered, constants.RECIPE_FRAGMENT_TIMEOUT)
+        fragments.update(rendered)
+
+    return [fragments[fragment_keys[recipe.pk]] for recipe in recipes]
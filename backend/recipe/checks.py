@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, кэш которых виден только своему процессу.
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Версии кэша, кэшированные ответы и задачи экспорта PDF должны быть
+    общими для всех воркеров gunicorn и management-команд. С кэшем в
+    памяти процесса изменения из другого процесса не видны, а статус
+    задачи экспорта доступен только воркеру, который её создал.
+    """
+    if settings.DEBUG:
+        return []
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "Кэш по умолчанию хранится в памяти процесса.",
+            hint=(
+                "Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша, "
+                "например Redis из docker-compose.production.yml. Иначе "
+                "изменения из других воркеров и management-команд не "
+                "видны до перезапуска."
+            ),
+            id="recipe.W001",
+        )
+    ]
@@ -1,6 +1,47 @@
 RECIPE_NAME_LENGTH = 256
+RECIPE_THUMBNAIL_SIZE = (480, 320)
+
+# Режим keyset-пагинации ленты рецептов: ?pagination=cursor
+PAGINATION_MODE_PARAM = "pagination"
+CURSOR_PAGINATION_MODE = "cursor"
+
+# Время жизни закэшированных ответов рецептов для анонимов (в секундах)
+RECIPES_CACHE_TIMEOUT = 60 * 15
+# Фрагменты рецептов версионированы, поэтому могут жить дольше
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Константы для скачивания списка ингредиентов
+SHOPPING_LIST_FILENAME = "shopping_cart"
+EXPORT_FORMAT_PARAM = "format"
+DEFAULT_EXPORT_FORMAT = "pdf"
+# Готовые файлы списка покупок хранятся в кэше до изменения корзины
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_LIST_MAX_CACHED_SIZE = 2 * 1024 * 1024
+# Фоновый рендеринг PDF: размер пула процессов, время хранения задачи
+# и число строк, до которого PDF рендерится сразу, без очереди
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_TIMEOUT = 60 * 60
+EXPORT_JOB_SYNC_MAX_ROWS = 50
+
+# Лента подписок: рецепты авторов с числом подписчиков не больше
+# FEED_FANOUT_MAX_SUBSCRIBERS рассылаются в ленты при публикации
+# (пачками по FEED_FANOUT_BATCH_SIZE), остальные читаются при запросе.
+# Рассылка идёт в запросе публикации (on_commit) и занимает воркер:
+# 1000 записей — десятки миллисекунд, 10000 — около полсекунды.
+# Рецепты более популярных авторов дёшево читаются по частичному
+# индексу, поэтому порог держит публикацию в цене обычного запроса.
+FEED_FANOUT_MAX_SUBSCRIBERS = 1000
+FEED_FANOUT_BATCH_SIZE = 1000
+
+# Поиск неиспользуемых медиафайлов (clean_media): каталоги внутри
+# MEDIA_ROOT, размер пачки для сверки с БД и минимальный возраст файла
+MEDIA_GC_DIRS = ("recipes/images", "users")
+MEDIA_GC_BATCH_SIZE = 500
+MEDIA_GC_MIN_AGE = 60 * 60
 
 # Константы для скачивания списка ингредиентов в PDF
+PDF_FONT_NAME = "FreeSerif"
+PDF_FONT_FILE = "FreeSerif.ttf"
 COORDINAT_X_TITLE = 100
 COORDINAT_Y_TITLE = 800
 COORDINAT_X_ROW = 50
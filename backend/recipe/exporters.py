@@ -0,0 +1,207 @@
+import csv
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from . import constants
+from .cache import (get_shopping_list_artifact, set_shopping_list_artifact,
+                    shopping_list_stamp)
+from .mixins import get_shopping_list
+from .models import Basket
+from .rendering import render_shopping_list_pdf
+
+
+def shopping_list_tuples(rows):
+    """Строки get_shopping_list() в виде (name, measurement_unit, amount)."""
+    for row in rows:
+        yield (
+            row["ingredient__name"],
+            row["ingredient__measurement_unit"],
+            row["total_amount"],
+        )
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    Параметр format выбирает экспортёр списка покупок,
+    а не рендерер DRF, поэтому он не участвует в согласовании.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class BaseShoppingListExporter:
+    """
+    Базовый экспортёр списка покупок. Наследники реализуют chunks(),
+    генератор частей файла (bytes) по строкам get_shopping_list().
+    """
+
+    format = None
+    content_type = None
+    streaming = True
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def filename(self):
+        return f"{constants.SHOPPING_LIST_FILENAME}.{self.format}"
+
+    def rows(self):
+        return get_shopping_list(self.user)
+
+    def chunks(self):
+        raise NotImplementedError
+
+    def _store(self, chunks, stamp):
+        """
+        Отдаёт части файла дальше и сохраняет собранный файл в кэш.
+        Сборка прекращается, если файл превысил допустимый размер.
+        """
+        parts, size = [], 0
+        for chunk in chunks:
+            yield chunk
+            if parts is not None:
+                size += len(chunk)
+                if size > constants.SHOPPING_LIST_MAX_CACHED_SIZE:
+                    parts = None
+                else:
+                    parts.append(chunk)
+        if parts is not None:
+            set_shopping_list_artifact(
+                self.user.pk, self.format, stamp, b"".join(parts)
+            )
+
+    def _attachment(self, response):
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.filename}"'
+        )
+        return response
+
+    def response(self, chunks=None):
+        chunks = self.chunks() if chunks is None else chunks
+        if self.streaming:
+            return self._attachment(
+                StreamingHttpResponse(chunks, content_type=self.content_type)
+            )
+        return self._attachment(
+            HttpResponse(b"".join(chunks), content_type=self.content_type)
+        )
+
+    def cached_response(self, request):
+        """
+        Ответ с ETag по версии корзины. Повторное скачивание без
+        изменений корзины отдаёт сохранённый файл (или 304) без
+        агрегации и рендеринга.
+        """
+        recipe_ids = Basket.objects.filter(user=self.user).values_list(
+            "recipe_id", flat=True
+        )
+        stamp = shopping_list_stamp(self.user, recipe_ids, self.format)
+        etag = quote_etag(stamp)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content = get_shopping_list_artifact(
+                self.user.pk, self.format, stamp
+            )
+            if content is not None:
+                response = self._attachment(
+                    HttpResponse(content, content_type=self.content_type)
+                )
+            else:
+                response = self.response(
+                    self._store(self.chunks(), stamp)
+                )
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+
+class TXTShoppingListExporter(BaseShoppingListExporter):
+    format = "txt"
+    content_type = "text/plain; charset=utf-8"
+
+    def chunks(self):
+        yield (
+            f"Корзина покупок ингредиентов, "
+            f"пользователя {self.user.username}\n\n"
+        ).encode()
+        for row in self.rows():
+            yield (
+                f"* {row['ingredient__name']}"
+                f"({row['ingredient__measurement_unit']})"
+                f" - {row['total_amount']}\n"
+            ).encode()
+
+
+class CSVShoppingListExporter(BaseShoppingListExporter):
+    format = "csv"
+    content_type = "text/csv; charset=utf-8"
+
+    def chunks(self):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(("name", "measurement_unit", "amount")).encode()
+        for row in self.rows():
+            yield writer.writerow(
+                (
+                    row["ingredient__name"],
+                    row["ingredient__measurement_unit"],
+                    row["total_amount"],
+                )
+            ).encode()
+
+
+class JSONShoppingListExporter(BaseShoppingListExporter):
+    format = "json"
+    content_type = "application/json"
+
+    def chunks(self):
+        yield b"["
+        separator = b""
+        for row in self.rows():
+            item = {
+                "id": row["ingredient_id"],
+                "name": row["ingredient__name"],
+                "measurement_unit": row["ingredient__measurement_unit"],
+                "amount": row["total_amount"],
+            }
+            yield separator + json.dumps(item, ensure_ascii=False).encode()
+            separator = b","
+        yield b"]"
+
+
+class PDFShoppingListExporter(BaseShoppingListExporter):
+    """PDF собирается целиком: ReportLab пишет документ в один буфер."""
+
+    format = "pdf"
+    content_type = "application/pdf"
+    streaming = False
+
+    def chunks(self):
+        yield render_shopping_list_pdf(
+            self.user.username, shopping_list_tuples(self.rows())
+        )
+
+
+EXPORTERS = {
+    exporter.format: exporter
+    for exporter in (
+        PDFShoppingListExporter,
+        CSVShoppingListExporter,
+        TXTShoppingListExporter,
+        JSONShoppingListExporter,
+    )
+}
@@ -0,0 +1,189 @@
+"""
+Лента подписок: рецепты авторов, на которых подписан пользователь.
+
+Гибридная схема. Рецепт автора с числом подписчиков не больше
+FEED_FANOUT_MAX_SUBSCRIBERS после публикации записывается в FeedEntry
+каждого подписчика (fan-out-on-write) и помечается fanned_out. Рецепты
+популярных авторов не рассылаются: лента читает их напрямую из рецептов
+автора по частичному индексу (fan-out-on-read). Страница ленты —
+слияние двух keyset-выборок по (pub_date, id).
+"""
+import heapq
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+
+from registration.models import BaseUser, UserSubscription
+from registration.utils import LimitCursorPagination
+
+from . import constants
+from .models import FeedEntry, Recipe
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def fan_out_recipe(
+    recipe_id,
+    author_id,
+    max_subscribers=constants.FEED_FANOUT_MAX_SUBSCRIBERS,
+    batch_size=constants.FEED_FANOUT_BATCH_SIZE,
+):
+    """
+    Записывает рецепт в ленты подписчиков автора пачками. Для автора
+    с числом подписчиков больше max_subscribers (None — без ограничения)
+    ничего не делает. Возвращает число добавленных записей ленты: уже
+    существующие записи (ignore_conflicts) не считаются.
+    """
+    subscribers_count = (
+        BaseUser.objects.filter(pk=author_id)
+        .values_list("subscribers_count", flat=True)
+        .first()
+    )
+    if subscribers_count is None or (
+        max_subscribers is not None and subscribers_count > max_subscribers
+    ):
+        return 0
+
+    with transaction.atomic():
+        # Флаг ставится в той же транзакции, что и записи: до коммита
+        # рецепт виден в ленте через fan-out-on-read, после — через
+        # FeedEntry. Обновление блокирует строку от удаления рецепта.
+        if not Recipe.objects.filter(pk=recipe_id).update(fanned_out=True):
+            return 0
+        pub_date = Recipe.objects.values_list("pub_date", flat=True).get(
+            pk=recipe_id
+        )
+        entries = FeedEntry.objects.filter(recipe_id=recipe_id)
+        existing = entries.count()
+        subscribers = (
+            UserSubscription.objects.filter(subscription_id=author_id)
+            .values_list("user_id", flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+        for batch in batches(subscribers, batch_size):
+            FeedEntry.objects.bulk_create(
+                (
+                    FeedEntry(
+                        user_id=user_id, recipe_id=recipe_id, pub_date=pub_date
+                    )
+                    for user_id in batch
+                ),
+                ignore_conflicts=True,
+            )
+        return entries.count() - existing
+
+
+def follow(user_id, author_id, batch_size=constants.FEED_FANOUT_BATCH_SIZE):
+    """
+    Новая подписка: разосланные рецепты автора добавляются в ленту
+    подписчика. Нерассылавшиеся рецепты лента читает сама.
+    """
+    recipes = (
+        Recipe.objects.filter(author_id=author_id, fanned_out=True)
+        .values_list("pk", "pub_date")
+        .iterator(chunk_size=batch_size)
+    )
+    for batch in batches(recipes, batch_size):
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+                for pk, pub_date in batch
+            ),
+            ignore_conflicts=True,
+        )
+
+
+def unfollow(user_id, author_id):
+    """Отписка: рецепты автора убираются из ленты подписчика."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def feed_keys(user, limit, position=None):
+    """
+    Ключи (pub_date, id) не больше limit последних рецептов ленты
+    раньше позиции position. Каждая из двух выборок читает не больше
+    limit строк по своему индексу, поэтому цена страницы не зависит
+    от её глубины и размера ленты.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(
+        fanned_out=False,
+        author__in=UserSubscription.objects.filter(user=user).values(
+            "subscription_id"
+        ),
+    )
+    if position is not None:
+        pub_date, pk = position
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe_id__lt=pk)
+        )
+        pulled = pulled.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+
+    keys = set(
+        entries.order_by("-pub_date", "-recipe_id").values_list(
+            "pub_date", "recipe_id"
+        )[:limit]
+    )
+    keys.update(
+        pulled.order_by("-pub_date", "-id").values_list("pub_date", "id")[
+            :limit
+        ]
+    )
+    return heapq.nlargest(limit, keys)
+
+
+class FeedPagination(LimitCursorPagination):
+    """
+    Keyset-пагинатор ленты. Позиция в курсоре — (pub_date, id)
+    последнего рецепта страницы; переход только вперёд.
+    """
+
+    def paginate_feed(self, request, user):
+        """id рецептов страницы ленты в порядке вывода."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        position = None
+        if cursor is not None and cursor.position:
+            position = self._parse_position(cursor.position)
+
+        keys = feed_keys(user, self.page_size + 1, position)
+        self.has_next = len(keys) > self.page_size
+        keys = keys[:self.page_size]
+        if keys:
+            pub_date, pk = keys[-1]
+            self.next_position = f"{pub_date.isoformat()}|{pk}"
+        return [pk for _, pk in keys]
+
+    def _parse_position(self, position):
+        pub_date, _, pk = position.rpartition("|")
+        try:
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_previous_link(self):
+        return None
@@ -1,13 +1,20 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from .models import BaseUser, Recipe, Tag
+from .models import BaseUser, Basket, Favorite, Recipe, RecipeTag, Tag
 
 
 class RecipeFilter(FilterSet):
+    """
+    Фильтры сужают переданный queryset полусоединениями (EXISTS), поэтому
+    сочетаются друг с другом и не размножают строки: DISTINCT не нужен.
+    """
+
     tags = filters.ModelMultipleChoiceFilter(
         field_name="tags__slug",
         to_field_name="slug",
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method="tags_filter",
     )
     author = filters.ModelChoiceFilter(
         queryset=BaseUser.objects.all(),
@@ -25,14 +32,28 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ("is_in_shopping_cart", "is_favorited", "author", "tags")
 
-    def is_favorited_filter(self, queryset, name, value):
+    def tags_filter(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тэгов."""
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                RecipeTag.objects.filter(
+                    recipe=OuterRef("pk"), tag__in=[tag.pk for tag in value]
+                )
+            )
+        )
+
+    def _user_list_filter(self, queryset, model, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return user.favorites.all()
+            return queryset.filter(
+                Exists(model.objects.filter(user=user, recipe=OuterRef("pk")))
+            )
         return queryset
 
+    def is_favorited_filter(self, queryset, name, value):
+        return self._user_list_filter(queryset, Favorite, value)
+
     def is_in_shopping_cart_filter(self, queryset, name, value):
-        user = self.request.user
-        if value and not user.is_anonymous:
-            return user.shopping_carts.all()
-        return queryset
+        return self._user_list_filter(queryset, Basket, value)
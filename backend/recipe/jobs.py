@@ -0,0 +1,171 @@
+"""
+Фоновый экспорт PDF списка покупок.
+
+Рендеринг выполняет пул процессов воркера, принявшего задачу, а её
+статус и результат хранятся в кэше Django. Опрос может попасть в другой
+воркер gunicorn, поэтому кэш должен быть общим (Redis в compose);
+с кэшем в памяти процесса gunicorn.conf.py запускает один воркер.
+"""
+import logging
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.cache import cache
+
+from . import constants
+from .cache import (get_shopping_list_artifact, set_shopping_list_artifact,
+                    shopping_list_stamp)
+from .exporters import shopping_list_tuples
+from .mixins import get_shopping_list
+from .models import Basket
+from .rendering import render_shopping_list_pdf
+
+logger = logging.getLogger(__name__)
+
+EXPORT_JOB_KEY = "shopping_list:job:{job_id}"
+
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Пул процессов для рендеринга PDF, создаётся лениво в каждом
+    процессе gunicorn. Используется spawn: дочерние процессы не
+    наследуют соединения с БД и потоки воркера.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=constants.EXPORT_JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+def _discard_executor(executor):
+    """
+    Убирает сломанный пул (воркер убит OOM-killer или упал), чтобы
+    следующая задача создала новый.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _submit(username, rows):
+    """
+    Ставит рендеринг в пул, пересоздав его, если он сломан.
+    Возвращает (пул, future) или (None, None).
+    """
+    for _ in range(2):
+        executor = get_executor()
+        try:
+            future = executor.submit(render_shopping_list_pdf, username, rows)
+        except BrokenProcessPool:
+            _discard_executor(executor)
+        else:
+            return executor, future
+    return None, None
+
+
+def _save_job(job_id, job):
+    cache.set(
+        EXPORT_JOB_KEY.format(job_id=job_id),
+        job,
+        constants.EXPORT_JOB_TIMEOUT,
+    )
+
+
+def get_job(job_id, user):
+    """Задача экспорта пользователя или None."""
+    job = cache.get(EXPORT_JOB_KEY.format(job_id=job_id))
+    if job is None or job["user_id"] != user.pk:
+        return None
+    return job
+
+
+def _store_result(job_id, job, content):
+    """
+    Сохраняет готовый PDF. Файл больше SHOPPING_LIST_MAX_CACHED_SIZE
+    в кэш не кладётся: задача помечается выполненной без содержимого,
+    и файл рендерится заново при скачивании.
+    """
+    set_shopping_list_artifact(job["user_id"], "pdf", job["stamp"], content)
+    job = {**job, "status": JOB_DONE}
+    if len(content) <= constants.SHOPPING_LIST_MAX_CACHED_SIZE:
+        job["content"] = content
+    _save_job(job_id, job)
+    return job
+
+
+def _finish_job(job_id, job, executor, username, rows, future):
+    """
+    Сохраняет результат рендеринга из пула процессов. Если пул сломался
+    во время рендеринга, он пересоздаётся для следующих задач, а эта
+    задача дорендеривается в текущем потоке.
+    """
+    try:
+        content = future.result()
+    except BrokenProcessPool:
+        logger.warning(
+            "Export pool broke during job %s, rendering in process", job_id
+        )
+        _discard_executor(executor)
+        try:
+            content = render_shopping_list_pdf(username, rows)
+        except Exception:
+            logger.exception("Shopping list export job %s failed", job_id)
+            _save_job(job_id, {**job, "status": JOB_FAILED})
+            return
+    except Exception:
+        logger.exception("Shopping list export job %s failed", job_id)
+        _save_job(job_id, {**job, "status": JOB_FAILED})
+        return
+
+    _store_result(job_id, job, content)
+
+
+def create_job(user):
+    """
+    Ставит рендеринг PDF списка покупок в очередь пула процессов.
+    Агрегация выполняется здесь, в процесс передаются только строки.
+    Готовый файл из кэша и небольшие списки отдаются без очереди, как
+    и любые списки, если пул процессов не удалось пересоздать.
+    """
+    job_id = uuid.uuid4().hex
+    recipe_ids = Basket.objects.filter(user=user).values_list(
+        "recipe_id", flat=True
+    )
+    stamp = shopping_list_stamp(user, recipe_ids, "pdf")
+    job = {"user_id": user.pk, "stamp": stamp, "status": JOB_PENDING}
+
+    content = get_shopping_list_artifact(user.pk, "pdf", stamp)
+    if content is not None:
+        return job_id, _store_result(job_id, job, content)
+
+    rows = list(shopping_list_tuples(get_shopping_list(user)))
+    executor = future = None
+    if len(rows) > constants.EXPORT_JOB_SYNC_MAX_ROWS:
+        _save_job(job_id, job)
+        executor, future = _submit(user.username, rows)
+    if future is None:
+        content = render_shopping_list_pdf(user.username, rows)
+        return job_id, _store_result(job_id, job, content)
+
+    future.add_done_callback(
+        lambda done: _finish_job(
+            job_id, job, executor, user.username, rows, done
+        )
+    )
+    return job_id, job
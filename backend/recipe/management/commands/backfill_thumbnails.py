@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+
+from recipe import constants
+from recipe.models import Recipe
+from registration.constants import AVATAR_THUMBNAIL_SIZE
+from registration.models import BaseUser
+from registration.utils import make_thumbnail
+
+# (модель, поле изображения, поле превью, размер превью)
+TARGETS = (
+    (Recipe, "image", "image_thumbnail", constants.RECIPE_THUMBNAIL_SIZE),
+    (BaseUser, "avatar", "avatar_thumbnail", AVATAR_THUMBNAIL_SIZE),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт превью для картинок рецептов и аватаров, загруженных до "
+        "появления превью. Записи с превью не трогаются, поэтому повторный "
+        "запуск продолжает с того же места."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать записи без превью.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field, thumbnail_field, size in TARGETS:
+            queryset = (
+                model.objects.exclude(**{field: ""})
+                .filter(**{thumbnail_field: ""})
+                .only("pk", field, thumbnail_field)
+            )
+            label = model._meta.verbose_name_plural
+            if options["dry_run"]:
+                self.stdout.write(f"{label}: без превью {queryset.count()}")
+                continue
+
+            created = failed = 0
+            for instance in queryset.iterator():
+                if self._backfill(instance, field, thumbnail_field, size):
+                    created += 1
+                else:
+                    failed += 1
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{label}: создано превью {created}, "
+                    f"не удалось прочитать {failed}."
+                )
+            )
+
+    def _backfill(self, instance, field, thumbnail_field, size):
+        image = getattr(instance, field)
+        try:
+            with image.open("rb"):
+                thumbnail = make_thumbnail(image, size)
+        except OSError as error:
+            # Файла нет в хранилище или это не изображение.
+            self.stderr.write(f"{image.name}: {error}")
+            return False
+
+        getattr(instance, thumbnail_field).save(
+            thumbnail.name, thumbnail, save=False
+        )
+        # Сохранение через save() вызывает сигналы, которые сбрасывают
+        # закэшированные ответы с этой записью.
+        instance.save(update_fields=[thumbnail_field])
+        return True
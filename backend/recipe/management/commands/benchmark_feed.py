@@ -0,0 +1,202 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipe.feed import fan_out_recipe, feed_keys
+from recipe.models import FeedEntry, Recipe
+from registration.models import BaseUser, UserSubscription
+
+# Стратегии: (название, max_subscribers для fan_out_recipe или False,
+# если рецепты не рассылаются вовсе).
+STRATEGIES = (
+    ("fan-out-on-read", False),
+    ("fan-out-on-write", None),
+    ("гибрид", "threshold"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стратегии ленты подписок на синтетическом графе "
+        "подписок: fan-out-on-read, fan-out-on-write и гибрид. Данные "
+        "создаются в транзакции, которая откатывается в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=50,
+            help="Подписок на обычных авторов у одного пользователя.",
+        )
+        parser.add_argument(
+            "--celebrities",
+            type=int,
+            default=3,
+            help="Популярных авторов, на которых подписаны почти все.",
+        )
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=None,
+            help=(
+                "Порог подписчиков гибрида (по умолчанию половина "
+                "пользователей)."
+            ),
+        )
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--pages", type=int, default=5)
+        parser.add_argument("--samples", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        threshold = options["threshold"] or options["users"] // 2
+        with transaction.atomic():
+            users, recipes = self._build_graph(options)
+            readers = random.sample(
+                users, min(options["samples"], len(users))
+            )
+            for name, max_subscribers in STRATEGIES:
+                if max_subscribers == "threshold":
+                    max_subscribers = threshold
+                self._run(name, max_subscribers, recipes, readers, options)
+            transaction.set_rollback(True)
+
+    def _build_graph(self, options):
+        """Пользователи, подписки и рецепты без рассылки в ленты."""
+        prefix = f"feedbench{time.time_ns()}"
+        BaseUser.objects.bulk_create(
+            BaseUser(
+                username=f"{prefix}{number}",
+                email=f"{prefix}{number}@example.com",
+                password="!",
+            )
+            for number in range(options["users"])
+        )
+        users = list(
+            BaseUser.objects.filter(
+                username__startswith=prefix
+            ).values_list("pk", flat=True)
+        )
+        celebrities = users[:options["celebrities"]]
+        authors = users[options["celebrities"]:]
+
+        subscriptions = set()
+        for user in users:
+            followed = random.sample(
+                authors, min(options["follows"], len(authors))
+            )
+            subscriptions.update(
+                (user, author)
+                for author in followed + celebrities
+                if author != user
+            )
+        UserSubscription.objects.bulk_create(
+            (
+                UserSubscription(user_id=user, subscription_id=author)
+                for user, author in subscriptions
+            ),
+            batch_size=5000,
+        )
+        counts = {}
+        for _, author in subscriptions:
+            counts[author] = counts.get(author, 0) + 1
+        BaseUser.objects.bulk_update(
+            (
+                BaseUser(pk=author, subscribers_count=count)
+                for author, count in counts.items()
+            ),
+            ("subscribers_count",),
+            batch_size=5000,
+        )
+
+        # Популярные авторы публикуют чаще остальных.
+        weights = [20 if user in celebrities else 1 for user in users]
+        now = timezone.now()
+        minute = timedelta(minutes=1)
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=f"{prefix}{number}",
+                    text="",
+                    cooking_time=1,
+                    author_id=author,
+                )
+                for number, author in enumerate(
+                    random.choices(users, weights, k=options["recipes"])
+                )
+            ),
+            batch_size=5000,
+        )
+        recipes = list(
+            Recipe.objects.filter(name__startswith=prefix).values_list(
+                "pk", "author_id"
+            )
+        )
+        # bulk_create проставляет одно время публикации всем рецептам.
+        Recipe.objects.bulk_update(
+            (
+                Recipe(
+                    pk=pk,
+                    pub_date=now - (len(recipes) - number) * minute,
+                )
+                for number, (pk, _) in enumerate(recipes)
+            ),
+            ("pub_date",),
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f"Пользователей: {len(users)}, подписок: {len(subscriptions)}, "
+            f"рецептов: {len(recipes)}."
+        )
+        return users, recipes
+
+    def _run(self, name, max_subscribers, recipes, readers, options):
+        recipe_ids = [pk for pk, _ in recipes]
+        FeedEntry.objects.filter(recipe_id__in=recipe_ids).delete()
+        Recipe.objects.filter(pk__in=recipe_ids).update(fanned_out=False)
+
+        write_times = []
+        if max_subscribers is not False:
+            for pk, author_id in recipes:
+                started = time.perf_counter()
+                fan_out_recipe(pk, author_id, max_subscribers)
+                write_times.append(time.perf_counter() - started)
+        entries = FeedEntry.objects.filter(recipe_id__in=recipe_ids).count()
+
+        first_page, deep_page = [], []
+        for user in readers:
+            position = None
+            for page in range(options["pages"]):
+                started = time.perf_counter()
+                keys = feed_keys(user, options["page_size"] + 1, position)
+                elapsed = time.perf_counter() - started
+                (first_page if page == 0 else deep_page).append(elapsed)
+                if len(keys) <= options["page_size"]:
+                    break
+                position = keys[options["page_size"] - 1]
+
+        self.stdout.write(
+            f"{name}: записей ленты {entries}; публикация "
+            f"{self._ms(write_times)}; первая страница "
+            f"{self._ms(first_page)}; следующие {self._ms(deep_page)}"
+        )
+
+    @staticmethod
+    def _ms(values):
+        if not values:
+            return "-"
+        values = sorted(values)
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        return (
+            f"p50 {statistics.median(values) * 1000:.2f} мс, "
+            f"p95 {p95 * 1000:.2f} мс"
+        )
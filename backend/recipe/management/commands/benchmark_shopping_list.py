@@ -0,0 +1,157 @@
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ingredient.models import Ingredient
+from recipe.mixins import get_shopping_list
+from recipe.models import Basket, Recipe, RecipeIngredient
+from registration.models import BaseUser
+
+
+def prefetch_shopping_list(user):
+    """
+    Прежняя сборка списка: рецепты корзины с ингредиентами загружаются
+    объектами, суммы считаются в Python.
+    """
+    totals = {}
+    recipes = user.shopping_carts.prefetch_related(
+        "recipe_ingredients__ingredient"
+    )
+    for recipe in recipes:
+        for item in recipe.recipe_ingredients.all():
+            key = (item.ingredient.name, item.ingredient.measurement_unit)
+            totals[key] = totals.get(key, 0) + item.amount
+    return [(name, unit, amount) for (name, unit), amount in totals.items()]
+
+
+def aggregated_shopping_list(user):
+    """Текущая сборка: GROUP BY и SUM в БД (get_shopping_list)."""
+    return [
+        (
+            row["ingredient__name"],
+            row["ingredient__measurement_unit"],
+            row["total_amount"],
+        )
+        for row in get_shopping_list(user)
+    ]
+
+
+STRATEGIES = (
+    ("prefetch", prefetch_shopping_list),
+    ("агрегация в БД", aggregated_shopping_list),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает сборку списка покупок на большой корзине: загрузку "
+        "рецептов с ингредиентами и агрегацию в БД. Данные создаются в "
+        "транзакции, которая откатывается в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument(
+            "--per-recipe",
+            type=int,
+            default=15,
+            help="Ингредиентов в одном рецепте.",
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        with transaction.atomic():
+            user = self._build_cart(options)
+            expected = None
+            for name, build in STRATEGIES:
+                result = sorted(
+                    self._run(name, build, user, options["runs"])
+                )
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    self.stderr.write(f"{name}: список отличается")
+            transaction.set_rollback(True)
+
+    def _build_cart(self, options):
+        """Пользователь с корзиной из рецептов со случайными ингредиентами."""
+        prefix = f"cartbench{time.time_ns()}"
+        user = BaseUser.objects.create_user(
+            username=prefix, email=f"{prefix}@example.com", password="!"
+        )
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=f"{prefix} {number}", measurement_unit="г")
+                for number in range(options["ingredients"])
+            ),
+            batch_size=5000,
+        )
+        ingredients = list(
+            Ingredient.objects.filter(name__startswith=prefix).values_list(
+                "pk", flat=True
+            )
+        )
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=f"{prefix}{number}",
+                    text="",
+                    cooking_time=1,
+                    author=user,
+                )
+                for number in range(options["recipes"])
+            ),
+            batch_size=5000,
+        )
+        recipes = list(
+            Recipe.objects.filter(name__startswith=prefix).values_list(
+                "pk", flat=True
+            )
+        )
+        per_recipe = min(options["per_recipe"], len(ingredients))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in random.sample(ingredients, per_recipe)
+            ),
+            batch_size=5000,
+        )
+        Basket.objects.bulk_create(
+            (Basket(user=user, recipe_id=recipe) for recipe in recipes),
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f"Рецептов в корзине: {len(recipes)}, ингредиентов в рецепте: "
+            f"{per_recipe}, всего ингредиентов: {len(ingredients)}."
+        )
+        return user
+
+    def _run(self, name, build, user, runs):
+        timings = []
+        tracemalloc.start()
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = build(user)
+                timings.append(time.perf_counter() - started)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{name}: строк {len(result)}, запросов {len(queries)}, "
+            f"среднее {statistics.mean(timings) * 1000:.1f} мс, "
+            f"пик памяти {peak / 1024:.0f} КиБ"
+        )
+        return result
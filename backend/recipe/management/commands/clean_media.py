@@ -0,0 +1,112 @@
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodgram.storage import referenced_names
+from recipe import constants
+
+
+def scan_files(root):
+    """Обходит каталог через os.scandir, не собирая список файлов целиком."""
+    directories = [root]
+    while directories:
+        try:
+            entries = os.scandir(directories.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет медиафайлы рецептов и пользователей, на которые не "
+        "ссылается ни одна запись в БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только вывести неиспользуемые файлы, не удаляя их.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Удалений в секунду, не больше (0 — без ограничений).",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=constants.MEDIA_GC_MIN_AGE,
+            help=(
+                "Не трогать файлы моложе стольких секунд: запись о только "
+                "что загруженном файле может быть ещё не сохранена."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=constants.MEDIA_GC_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        delay = 1 / options["rate"] if options["rate"] > 0 else 0
+        deadline = time.time() - options["min_age"]
+
+        scanned = orphans = freed = 0
+        for directory in constants.MEDIA_GC_DIRS:
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            for batch in batches(scan_files(root), options["batch_size"]):
+                scanned += len(batch)
+                files = {
+                    os.path.relpath(entry.path, settings.MEDIA_ROOT).replace(
+                        os.sep, "/"
+                    ): entry
+                    for entry in batch
+                    if entry.stat().st_mtime < deadline
+                }
+                referenced = referenced_names(list(files))
+
+                for name, entry in files.items():
+                    if name in referenced:
+                        continue
+                    size = entry.stat().st_size
+                    if dry_run:
+                        self.stdout.write(name)
+                    else:
+                        # Файл мог быть заново загружен после сверки.
+                        try:
+                            if os.stat(entry.path).st_mtime >= deadline:
+                                continue
+                        except FileNotFoundError:
+                            continue
+                        default_storage.delete(name)
+                        if delay:
+                            time.sleep(delay)
+                    orphans += 1
+                    freed += size
+
+        action = "Найдено" if dry_run else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Просмотрено файлов: {scanned}. {action} неиспользуемых: "
+                f"{orphans} ({freed / 2 ** 20:.1f} МиБ)."
+            )
+        )
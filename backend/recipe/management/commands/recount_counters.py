@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipe.models import Basket, Favorite, Recipe
+from registration.models import BaseUser, UserSubscription
+
+
+def count_subquery(queryset, field):
+    """Подзапрос COUNT(*) связанных строк для каждой строки OuterRef."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fix_counters(queryset, **counters):
+    """
+    Одним UPDATE исправляет строки, у которых денормализованные
+    счётчики расходятся с фактическими. Возвращает число строк.
+    """
+    condition = Q()
+    for name in counters:
+        condition |= ~Q(**{name: F(f"actual_{name}")})
+
+    drifted = queryset.alias(
+        **{f"actual_{name}": value for name, value in counters.items()}
+    ).filter(condition)
+    return queryset.filter(pk__in=drifted.values("pk")).update(**counters)
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики favorites_count/baskets_count рецептов и "
+        "subscribers_count/recipes_count пользователей."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes_fixed = fix_counters(
+                Recipe.objects.all(),
+                favorites_count=count_subquery(
+                    Favorite.objects.all(), "recipe"
+                ),
+                baskets_count=count_subquery(Basket.objects.all(), "recipe"),
+            )
+            users_fixed = fix_counters(
+                BaseUser.objects.all(),
+                subscribers_count=count_subquery(
+                    UserSubscription.objects.all(), "subscription"
+                ),
+                recipes_count=count_subquery(Recipe.objects.all(), "author"),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Исправлено рецептов: {recipes_fixed}, "
+                f"пользователей: {users_fixed}."
+            )
+        )
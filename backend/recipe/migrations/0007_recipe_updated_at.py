@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0006_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Время изменения"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipe", "Recipe")
+    Favorite = apps.get_model("recipe", "Favorite")
+    Basket = apps.get_model("recipe", "Basket")
+    BaseUser = apps.get_model("registration", "BaseUser")
+    UserSubscription = apps.get_model("registration", "UserSubscription")
+
+    Recipe.objects.update(
+        favorites_count=count_subquery(Favorite, "recipe"),
+        baskets_count=count_subquery(Basket, "recipe"),
+    )
+    BaseUser.objects.update(
+        subscribers_count=count_subquery(UserSubscription, "subscription"),
+        recipes_count=count_subquery(Recipe, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0007_recipe_updated_at"),
+        ("registration", "0007_baseuser_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="baskets_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество в корзине"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество в избранном"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
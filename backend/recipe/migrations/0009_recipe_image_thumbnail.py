@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0008_recipe_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_thumbnail",
+            field=models.ImageField(
+                blank=True,
+                help_text="Превью картинки рецепта для списков",
+                upload_to="recipes/images/thumbnails/",
+            ),
+        ),
+    ]
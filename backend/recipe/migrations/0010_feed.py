@@ -0,0 +1,87 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredient", "0003_name_prefix_idx"),
+        ("recipe", "0009_recipe_image_thumbnail"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("pub_date", models.DateTimeField(verbose_name="Время публикации")),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Лента подписок",
+                "ordering": ("-pub_date",),
+            },
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="fanned_out",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Рецепт есть в FeedEntry подписчиков автора; иначе лента читает его напрямую из рецептов автора",
+                verbose_name="Разослан в ленты подписчиков",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                condition=models.Q(("fanned_out", False)),
+                fields=["author", "-pub_date", "-id"],
+                name="recipe_not_fanned_out_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to="recipe.recipe",
+                verbose_name="Recipe",
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "-pub_date", "-recipe"], name="feed_user_pub_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_user_feed_recipe"
+            ),
+        ),
+    ]
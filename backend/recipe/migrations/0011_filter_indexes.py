@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredient", "0003_name_prefix_idx"),
+        ("recipe", "0010_feed"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="basket",
+            index=models.Index(
+                fields=["user", "recipe"], name="basket_user_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["user", "recipe"], name="favorite_user_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"], name="recipe_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipetag",
+            index=models.Index(fields=["tag", "recipe"], name="recipe_tag_tag_idx"),
+        ),
+    ]
@@ -1,25 +1,18 @@
 from collections import Counter
 
-from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Prefetch, Sum, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 
+from foodgram.storage import release_file
 from ingredient.models import Ingredient
+from recipe.cache import bump_ingredient_usage_version
 from recipe.models import Recipe, RecipeIngredient, RecipeTag
+from registration.utils import Base64ImageField
 
 
 # Вынос валидаторов, используемых в проекте.
-class ValidateIDMixin:
-    """Миксин для проверки существования объекта ингредиента по ID"""
-
-    def validate_id(self, value):
-        model = self.Meta.model
-        if not Ingredient.objects.filter(id=value).exists():
-            raise serializers.ValidationError(
-                f"Model {model} with ID {value} - does not exist."
-            )
-        return value
-
-
 class RecipeValidationMixin:
     """Миксин для валидации тегов и ингредиентов в рецептах."""
 
@@ -54,13 +47,40 @@ class RecipeValidationMixin:
         return self._validate_unique_items(value, "tags")
 
     def validate_ingredients(self, value):
-        """Валидация ингредиентов."""
-        return self._validate_unique_items(value, "ingredients")
+        """
+        Валидация ингредиентов: существование всех id проверяется
+        одним запросом, в ошибке перечисляются все отсутствующие id.
+        """
+        value = self._validate_unique_items(value, "ingredients")
+        ingredient_ids = [item["id"] for item in value]
+        existing_ids = set(
+            Ingredient.objects.filter(id__in=ingredient_ids).values_list(
+                "id", flat=True
+            )
+        )
+        missing_ids = [
+            ingredient_id
+            for ingredient_id in ingredient_ids
+            if ingredient_id not in existing_ids
+        ]
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Ингредиенты с id {missing_ids} не существуют."
+            )
+        return value
 
 
 # Вынос методов, используемых в проекте.
 class Favorit_ShoppingCart_Save_MethodsMixin:
+    """
+    Флаги is_favorited/is_in_shopping_cart берутся из аннотаций queryset
+    (см. CRUDRecipeViewSet.get_queryset), запрос к БД выполняется только
+    для неаннотированных объектов, например после создания рецепта.
+    """
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         return (
             not self.context["request"].user.is_anonymous
             and obj.recipe_users.filter(
@@ -69,6 +89,8 @@ class Favorit_ShoppingCart_Save_MethodsMixin:
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         return (
             not self.context["request"].user.is_anonymous
             and obj.purchasing_users.filter(
@@ -81,12 +103,14 @@ class Favorit_ShoppingCart_Save_MethodsMixin:
         ingredients = [
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=Ingredient.objects.get(id=ingredient_data["id"]),
+                ingredient_id=ingredient_data["id"],
                 amount=ingredient_data["amount"],
             )
             for ingredient_data in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(ingredients)
+        # bulk-операции не вызывают сигналы RecipeIngredient.
+        bump_ingredient_usage_version()
 
         tags = [
             RecipeTag(recipe=recipe, tag=tag_obj)
@@ -94,19 +118,165 @@ class Favorit_ShoppingCart_Save_MethodsMixin:
         ]
         RecipeTag.objects.bulk_create(tags)
 
+    def _update_ingredients_and_tags(self, recipe, ingredients_data,
+                                     tags_data):
+        """
+        Приводит ингредиенты и тэги рецепта к переданным, выполняя только
+        нужные вставки, bulk_update и удаления.
+        Возвращает True, если что-то изменилось.
+        """
+        current_ingredients = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        new_amounts = {
+            ingredient_data["id"]: ingredient_data["amount"]
+            for ingredient_data in ingredients_data
+        }
+
+        ingredients_to_create = []
+        ingredients_to_update = []
+        for ingredient_id, amount in new_amounts.items():
+            recipe_ingredient = current_ingredients.get(ingredient_id)
+            if recipe_ingredient is None:
+                ingredients_to_create.append(
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                )
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                ingredients_to_update.append(recipe_ingredient)
+        ingredients_to_delete = [
+            recipe_ingredient.pk
+            for ingredient_id, recipe_ingredient in current_ingredients.items()
+            if ingredient_id not in new_amounts
+        ]
+
+        current_tag_ids = {
+            recipe_tag.tag_id for recipe_tag in recipe.recipe_tags.all()
+        }
+        new_tag_ids = {tag.id for tag in tags_data}
+        tags_to_create = [
+            RecipeTag(recipe=recipe, tag_id=tag_id)
+            for tag_id in new_tag_ids - current_tag_ids
+        ]
+        tags_to_delete = current_tag_ids - new_tag_ids
+
+        if ingredients_to_delete:
+            RecipeIngredient.objects.filter(
+                pk__in=ingredients_to_delete
+            ).delete()
+        if ingredients_to_update:
+            RecipeIngredient.objects.bulk_update(
+                ingredients_to_update, ["amount"]
+            )
+        if ingredients_to_create:
+            RecipeIngredient.objects.bulk_create(ingredients_to_create)
+        if ingredients_to_create or ingredients_to_delete:
+            bump_ingredient_usage_version()
+        if tags_to_delete:
+            RecipeTag.objects.filter(
+                recipe=recipe, tag_id__in=tags_to_delete
+            ).delete()
+        if tags_to_create:
+            RecipeTag.objects.bulk_create(tags_to_create)
+
+        return bool(
+            ingredients_to_create
+            or ingredients_to_update
+            or ingredients_to_delete
+            or tags_to_create
+            or tags_to_delete
+        )
 
-def delete_file(file_path):
+
+def delete_file(file):
     """
     Функция для безопасного удаления image in recipe/avatar in user models.
+    Одинаковые изображения хранятся одним файлом (HashedMediaStorage),
+    поэтому файл удаляется после коммита транзакции и только если на него
+    больше не ссылается ни одна запись. Вызывать после изменения записи.
     """
-    if file_path and default_storage.exists(file_path):
-        default_storage.delete(file_path)
+    if file:
+        name, storage = file.name, file.storage
+        transaction.on_commit(lambda: release_file(name, storage))
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарно изменяет денормализованный счётчик через F()-выражение.
+    Счётчик не уходит в минус; расхождения исправляет
+    команда recount_counters.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def get_shopping_list(user):
+    """
+    Итоговый список покупок пользователя: один запрос с GROUP BY
+    по ингредиенту и SUM(amount), отсортированный по названию.
+    Строки читаются итератором, без загрузки рецептов в память.
+    """
+    return (
+        RecipeIngredient.objects.filter(recipe__purchasing_users__user=user)
+        .values(
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+        )
+        .annotate(total_amount=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+        .iterator()
+    )
+
+
+def parse_recipes_limit(value):
+    """Значение ?recipes_limit= или None, если оно не задано или неверно."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
+def author_recipes_prefetch(recipes_limit=None):
+    """
+    Prefetch последних рецептов авторов в атрибут limited_recipes.
+    С ограничением это один запрос на всю страницу авторов:
+    ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY pub_date DESC)
+    с фильтром по номеру строки вместо запроса на каждого автора.
+    """
+    queryset = Recipe.objects.order_by("-pub_date", "-id")
+    limit = parse_recipes_limit(recipes_limit)
+    if limit:
+        queryset = queryset.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=(F("pub_date").desc(), F("id").desc()),
+            )
+        ).filter(row_number__lte=limit)
+    return Prefetch(
+        "author_recipes", queryset=queryset, to_attr="limited_recipes"
+    )
 
 
 # Вынос объектов, используемых в проекте, имеющих зависимость с apps recipe.
 class RolledUpRecipeSerializer(serializers.ModelSerializer):
     """Серилизатор для чтения сокращенной формы рецептов"""
 
+    image = Base64ImageField(
+        read_only=True,
+        thumbnail_field="image_thumbnail",
+        thumbnail_by_default=True,
+    )
+
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
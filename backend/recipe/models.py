@@ -2,6 +2,7 @@ from django.core import validators
 from django.db import models
 from django.urls import reverse
 
+from foodgram.mixins import DenormalizedFieldsMixin, TrackedFieldsMixin
 from ingredient.models import Ingredient, Tag
 from registration.models import BaseUser
 
@@ -33,6 +34,13 @@ class Favorite(models.Model):
                 fields=["recipe", "user"], name="unique_user_recipe_favorite"
             )
         ]
+        # Для фильтра по спискам пользователя: EXISTS по (user, recipe)
+        # читается только из индекса.
+        indexes = [
+            models.Index(
+                fields=["user", "recipe"], name="favorite_user_recipe_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.user.username} добавлен - {self.recipe.name}"
@@ -63,6 +71,11 @@ class Basket(models.Model):
                 fields=["recipe", "user"], name="unique_user_recipe_basket"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user", "recipe"], name="basket_user_recipe_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.recipe.name}"
@@ -134,14 +147,21 @@ class RecipeTag(models.Model):
                 name="unique_recipe_tag"
             )
         ]
+        indexes = [
+            models.Index(fields=["tag", "recipe"], name="recipe_tag_tag_idx")
+        ]
 
     def __str__(self):
         return f"{self.recipe.name}: {self.tag.name}"
 
 
-class Recipe(models.Model):
+class Recipe(DenormalizedFieldsMixin, TrackedFieldsMixin, models.Model):
     """Модель рецептов"""
 
+    denormalized_fields = ("favorites_count", "baskets_count", "fanned_out")
+    # Смена автора переносит рецепт между счётчиками recipes_count.
+    tracked_fields = ("author_id",)
+
     name = models.CharField(
         verbose_name="Название рецепта",
         help_text="Максимальная длинна 256 символов",
@@ -170,6 +190,11 @@ class Recipe(models.Model):
         help_text="Картинка рецепта, закодированная в Base64",
         upload_to="recipes/images/",
     )
+    image_thumbnail = models.ImageField(
+        help_text="Превью картинки рецепта для списков",
+        upload_to="recipes/images/thumbnails/",
+        blank=True,
+    )
     author = models.ForeignKey(
         to=BaseUser,
         verbose_name="Author",
@@ -181,12 +206,35 @@ class Recipe(models.Model):
         verbose_name="Время публикации",
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Время изменения",
+        auto_now=True
+    )
     favorite = models.ManyToManyField(
         to=BaseUser, through=Favorite, related_name="favorites"
     )
     shopping_cart = models.ManyToManyField(
         to=BaseUser, through=Basket, related_name="shopping_carts"
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Количество в избранном",
+        default=0,
+        editable=False,
+    )
+    baskets_count = models.PositiveIntegerField(
+        verbose_name="Количество в корзине",
+        default=0,
+        editable=False,
+    )
+    fanned_out = models.BooleanField(
+        verbose_name="Разослан в ленты подписчиков",
+        help_text=(
+            "Рецепт есть в FeedEntry подписчиков автора; иначе лента "
+            "читает его напрямую из рецептов автора"
+        ),
+        default=False,
+        editable=False,
+    )
 
     def get_absolute_url(self):
         return reverse("recipe-detail", kwargs={"pk": self.pk})
@@ -195,6 +243,61 @@ class Recipe(models.Model):
         ordering = ("-pub_date",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"], name="recipe_pub_date_id_idx"
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                condition=models.Q(fanned_out=False),
+                name="recipe_not_fanned_out_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name}"
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан user.
+    Заполняется при публикации рецепта (см. feed.py); pub_date
+    скопирована из рецепта для keyset-пагинации по индексу ленты.
+    """
+
+    user = models.ForeignKey(
+        to=BaseUser,
+        verbose_name="User",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    recipe = models.ForeignKey(
+        to=Recipe,
+        verbose_name="Recipe",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    pub_date = models.DateTimeField(verbose_name="Время публикации")
+
+    class Meta:
+        ordering = ("-pub_date",)
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_user_feed_recipe"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="feed_user_pub_date_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.recipe.name}"
@@ -0,0 +1,57 @@
+import io
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from . import constants
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font():
+    """Регистрирует шрифт ReportLab один раз на процесс."""
+    pdfmetrics.registerFont(
+        TTFont(constants.PDF_FONT_NAME, constants.PDF_FONT_FILE)
+    )
+    return constants.PDF_FONT_NAME
+
+
+def render_shopping_list_pdf(username, rows):
+    """
+    Возвращает PDF (bytes) списка покупок.
+    rows - итерируемое из кортежей (name, measurement_unit, amount).
+    Не обращается к Django и БД, поэтому выполняется и в процессах
+    пула экспорта (см. jobs.py).
+    """
+    font = register_pdf_font()
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+
+    page.setFont(font, constants.HEADER_SIZE)
+    page.drawString(
+        constants.COORDINAT_X_TITLE,
+        constants.COORDINAT_Y_TITLE,
+        f"""Корзина покупок ингредиентов,
+        пользователя {username}""",
+    )
+    page.setFont(font, constants.ROW_SIZE)
+
+    x_row, y_row = constants.COORDINAT_X_ROW, constants.COORDINAT_Y_ROW
+    for name, measurement_unit, amount in rows:
+        page.drawString(
+            x_row, y_row, f"* {name}({measurement_unit}) - {amount}"
+        )
+        y_row -= constants.LINE_INDENTATION
+
+        if y_row <= constants.PAGE_MISSING:
+            page.showPage()
+            page.setFont(font, constants.ROW_SIZE)
+            y_row = (
+                constants.COORDINAT_Y_TITLE - constants.COORDINAT_Y_ROW
+            ) + constants.COORDINAT_Y_ROW
+
+    page.showPage()
+    page.save()
+    return buffer.getvalue()
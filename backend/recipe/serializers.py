@@ -1,21 +1,21 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import transaction
 from rest_framework import serializers
 
+from ingredient.catalog import context_catalog
 from ingredient.models import Tag
 from ingredient.serializers import ReadOnlyTagSerializer
 from registration.serializers import FullProfileSerializer
-from registration.utils import Base64ImageField
+from registration.utils import Base64ImageField, make_thumbnail
 
 from . import constants
 from .mixins import (Favorit_ShoppingCart_Save_MethodsMixin,
                      RecipeValidationMixin, RolledUpRecipeSerializer,
-                     ValidateIDMixin)
+                     delete_file)
 from .models import Recipe, RecipeIngredient
 
 
-class IngredientSerializerForRecipe(
-    ValidateIDMixin, serializers.ModelSerializer
-):
+class IngredientSerializerForRecipe(serializers.ModelSerializer):
     """Серилизатор для обработки ингредиентов в recipe"""
 
     id = serializers.IntegerField(required=True)
@@ -36,11 +36,17 @@ class IngredientSerializerForRecipe(
 
     def to_representation(self, instance):
         """
-        Переопределяем метод для корректной выдачи id ингредиента в ответе
+        Название и единица измерения берутся из кэша каталога, без
+        загрузки ингредиента из БД.
         """
-        representation = super().to_representation(instance)
-        representation["id"] = instance.ingredient.id
-        return representation
+        ingredient = context_catalog(self.context).ingredients.get(
+            instance.ingredient_id
+        )
+        if ingredient is None:
+            representation = super().to_representation(instance)
+            representation["id"] = instance.ingredient_id
+            return representation
+        return {**ingredient, "amount": instance.amount}
 
 
 class TagListSerializer(serializers.ListField):
@@ -48,11 +54,37 @@ class TagListSerializer(serializers.ListField):
     Серилизатор для обработки списка ID тэгов и их преобразования в объекты.
     """
 
-    child = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all())
+    child = serializers.IntegerField()
+
+    def to_internal_value(self, data):
+        """
+        Преобразует id в объекты тэгов одним запросом,
+        в ошибке перечисляются все отсутствующие id.
+        """
+        tag_ids = super().to_internal_value(data)
+        tags = Tag.objects.in_bulk(tag_ids)
+        missing_ids = [tag_id for tag_id in tag_ids if tag_id not in tags]
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Тэги с id {missing_ids} не существуют."
+            )
+        return [tags[tag_id] for tag_id in tag_ids]
 
     def to_representation(self, data):
-        """Переопределяем метод для возврата списка объектов тэгов."""
-        return ReadOnlyTagSerializer(data.all(), many=True).data
+        """
+        Тэги рецепта из кэша каталога по id из recipe_tags
+        (предзагружаются во вьюсете), в порядке каталога.
+        """
+        catalog = context_catalog(self.context)
+        tag_ids = [
+            recipe_tag.tag_id for recipe_tag in data.instance.recipe_tags.all()
+        ]
+        if not all(tag_id in catalog.tags for tag_id in tag_ids):
+            return ReadOnlyTagSerializer(data.all(), many=True).data
+        return [
+            catalog.tags[tag_id]
+            for tag_id in sorted(tag_ids, key=catalog.tag_order.get)
+        ]
 
 
 class CRUDRecipeSerializer(
@@ -68,7 +100,9 @@ class CRUDRecipeSerializer(
     tags = TagListSerializer(required=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField(required=True)
+    image = Base64ImageField(
+        required=True, thumbnail_field="image_thumbnail"
+    )
     author = FullProfileSerializer(
         read_only=True,
     )
@@ -95,25 +129,56 @@ class CRUDRecipeSerializer(
             "cooking_time",
         )
 
+    def to_representation(self, instance):
+        """
+        Передаёт аннотацию подписки на автора в FullProfileSerializer,
+        чтобы не выполнять запрос на каждого автора.
+        """
+        if hasattr(instance, "is_author_subscribed"):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
+
+    def with_user_flags(self, instance, data):
+        """
+        Накладывает флаги текущего пользователя (is_favorited,
+        is_in_shopping_cart, author.is_subscribed) на закэшированный
+        фрагмент рецепта, общий для всех пользователей.
+        """
+        if hasattr(instance, "is_author_subscribed"):
+            is_subscribed = instance.is_author_subscribed
+        else:
+            is_subscribed = self.fields["author"].get_is_subscribed(
+                instance.author
+            )
+
+        return {
+            **data,
+            "author": {**data["author"], "is_subscribed": is_subscribed},
+            "is_favorited": self.get_is_favorited(instance),
+            "is_in_shopping_cart": self.get_is_in_shopping_cart(instance),
+        }
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop("recipe_ingredients")
         tags_data = validated_data.pop("tags")
 
+        validated_data["image_thumbnail"] = make_thumbnail(
+            validated_data["image"], constants.RECIPE_THUMBNAIL_SIZE
+        )
         recipe = Recipe.objects.create(**validated_data)
 
         self._save_ingredients_and_tags(recipe, ingredients_data, tags_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Обновление валидированных данных для рецепта"""
-        instance.name = validated_data.get("name", instance.name)
-        instance.image = validated_data.get("image", instance.image)
-        instance.text = validated_data.get("text", instance.text)
-        instance.cooking_time = validated_data.get(
-            "cooking_time", instance.cooking_time
-        )
-        instance.save()
-
+        """
+        Обновление валидированных данных для рецепта.
+        Ингредиенты и тэги обновляются по разнице с текущими строками.
+        Если ничего не изменилось, рецепт не сохраняется и кэши не
+        инвалидируются; результат сравнения в self.changed.
+        """
         if (
             not validated_data.get("recipe_ingredients")
             or not validated_data.get("tags")
@@ -125,10 +190,52 @@ class CRUDRecipeSerializer(
         ingredients_data = validated_data.pop("recipe_ingredients")
         tags_data = validated_data.pop("tags")
 
-        instance.recipe_ingredients.all().delete()
-        instance.recipe_tags.all().delete()
+        old_files = (instance.image, instance.image_thumbnail)
+        self.changed = "image" in validated_data
+        if self.changed:
+            validated_data["image_thumbnail"] = make_thumbnail(
+                validated_data["image"], constants.RECIPE_THUMBNAIL_SIZE
+            )
+        for field in ("name", "text", "cooking_time"):
+            if field in validated_data and (
+                validated_data[field] != getattr(instance, field)
+            ):
+                self.changed = True
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+
+        relations_changed = self._update_ingredients_and_tags(
+            instance, ingredients_data, tags_data
+        )
+        self.changed = self.changed or relations_changed
+
+        if self.changed:
+            instance.save()
+        if "image" in validated_data:
+            for file in old_files:
+                delete_file(file)
+        return instance
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Серилизатор для замены изображения рецепта"""
+
+    image = Base64ImageField(required=True)
+
+    class Meta:
+        model = Recipe
+        fields = ("image",)
+
+    def update(self, instance, validated_data):
+        """Старые изображение и превью удаляются из хранилища"""
+        old_files = (instance.image, instance.image_thumbnail)
+        validated_data["image_thumbnail"] = make_thumbnail(
+            validated_data["image"], constants.RECIPE_THUMBNAIL_SIZE
+        )
+        instance = super().update(instance, validated_data)
 
-        self._save_ingredients_and_tags(instance, ingredients_data, tags_data)
+        for file in old_files:
+            delete_file(file)
         return instance
 
 
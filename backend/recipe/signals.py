@@ -0,0 +1,142 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ingredient.models import Ingredient, Tag
+from registration.models import BaseUser, UserSubscription
+
+from .cache import (bump_cart_version, bump_catalog_version,
+                    bump_ingredient_usage_version, bump_recipes_version,
+                    bump_user_state_version, bump_users_version)
+from .feed import fan_out_recipe, follow, unfollow
+from .mixins import change_counter
+from .models import Basket, Favorite, Recipe, RecipeIngredient, RecipeTag
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Изменение/удаление рецепта инвалидирует кэш его автора."""
+    bump_recipes_version(instance.author_id, instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """Счётчик рецептов автора, в том числе при смене автора в админке."""
+    if created:
+        change_counter(BaseUser, instance.author_id, "recipes_count", 1)
+        return
+    previous_author_id = instance.loaded_value("author_id")
+    if (
+        previous_author_id is not None
+        and previous_author_id != instance.author_id
+    ):
+        change_counter(BaseUser, previous_author_id, "recipes_count", -1)
+        change_counter(BaseUser, instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(BaseUser, instance.author_id, "recipes_count", -1)
+
+
+# Счётчики рецепта для списков пользователей. Обработчики срабатывают
+# и при каскадном удалении, например вместе с пользователем.
+LIST_COUNTERS = {Favorite: "favorites_count", Basket: "baskets_count"}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Basket)
+def recipe_list_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, LIST_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Basket)
+def recipe_list_removed(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, LIST_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Новый рецепт рассылается в ленты подписчиков после коммита."""
+    if created:
+        transaction.on_commit(
+            lambda: fan_out_recipe(instance.pk, instance.author_id)
+        )
+
+
+@receiver(post_save, sender=UserSubscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            BaseUser, instance.subscription_id, "subscribers_count", 1
+        )
+        follow(instance.user_id, instance.subscription_id)
+
+
+@receiver(post_delete, sender=UserSubscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counter(
+        BaseUser, instance.subscription_id, "subscribers_count", -1
+    )
+    unfollow(instance.user_id, instance.subscription_id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def recipe_relation_changed(sender, instance, **kwargs):
+    """
+    Изменение ингредиентов/тэгов рецепта. Версия автора обновляется
+    сохранением самого рецепта, которое сопровождает эти изменения.
+    """
+    bump_recipes_version(recipe_id=instance.recipe_id)
+    if sender is RecipeIngredient:
+        bump_ingredient_usage_version()
+
+
+@receiver(post_save, sender=BaseUser)
+def author_saved(sender, instance, created, **kwargs):
+    """
+    Профиль автора встроен в ответы рецептов. У нового пользователя
+    рецептов нет, а сохранения без изменений профиля (last_login,
+    пароль) ответы не меняют.
+    """
+    if created:
+        bump_users_version()
+    elif instance.changed_fields():
+        bump_users_version()
+        bump_recipes_version(instance.pk)
+
+
+@receiver(post_delete, sender=BaseUser)
+def author_deleted(sender, instance, **kwargs):
+    bump_users_version()
+    bump_recipes_version(instance.pk)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=Basket)
+@receiver(post_delete, sender=Basket)
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def user_state_changed(sender, instance, **kwargs):
+    bump_user_state_version(instance.user_id)
+
+
+@receiver(post_save, sender=Basket)
+@receiver(post_delete, sender=Basket)
+def cart_changed(sender, instance, **kwargs):
+    bump_cart_version(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, instance, **kwargs):
+    bump_catalog_version()
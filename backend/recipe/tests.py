@@ -0,0 +1,229 @@
+import base64
+import io
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from PIL import Image
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from ingredient.catalog import get_catalog
+from ingredient.models import Ingredient, Tag
+from registration.models import BaseUser, UserSubscription
+
+from .constants import RECIPE_THUMBNAIL_SIZE
+from .filters import RecipeFilter
+from .models import Basket, Favorite, Recipe, RecipeIngredient, RecipeTag
+
+
+class RecipeDataTestCase(APITestCase):
+    """Рецепты трёх авторов с тэгами, ингредиентами, избранным и корзиной."""
+
+    def setUp(self):
+        cache.clear()
+        self.tags = tags = [
+            Tag.objects.create(name=f"Тэг {number}", slug=f"tag{number}")
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(4)
+        ]
+        self.user = BaseUser.objects.create_user(
+            username="reader", email="reader@example.com", password="!"
+        )
+        self.authors = authors = [
+            BaseUser.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com",
+                password="!",
+            )
+            for number in range(3)
+        ]
+        UserSubscription.objects.create(
+            user=self.user, subscription=authors[0]
+        )
+        for number in range(20):
+            recipe = Recipe.objects.create(
+                name=f"Рецепт {number}",
+                text="",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+                author=authors[number % len(authors)],
+            )
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe=recipe, tag=tag) for tag in tags[:2]
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=item, amount=1)
+                for item in ingredients
+            )
+            if number % 2:
+                Favorite.objects.create(user=self.user, recipe=recipe)
+            if number % 3:
+                Basket.objects.create(user=self.user, recipe=recipe)
+
+    def filtered(self, **params):
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = self.user
+        return RecipeFilter(
+            params, queryset=Recipe.objects.all(), request=request
+        ).qs
+
+
+class RecipeListQueriesTests(RecipeDataTestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    def assert_list_queries(self, count):
+        for limit in (1, 6, 20):
+            with self.subTest(limit=limit):
+                # Холодный кэш ответов и фрагментов, каталог уже построен.
+                cache.clear()
+                get_catalog()
+                with self.assertNumQueries(count):
+                    response = self.client.get(
+                        "/api/recipes/", {"limit": limit}
+                    )
+                self.assertEqual(len(response.json()["results"]), limit)
+
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries(5)
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries(5)
+
+
+class RecipeFilterTests(RecipeDataTestCase):
+    """Фильтры сочетаются и не размножают строки."""
+
+    def test_tags_without_duplicates(self):
+        queryset = self.filtered(tags=["tag0", "tag1"])
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        self.assertEqual(queryset.count(), Recipe.objects.count())
+
+    def test_favorited_and_tags(self):
+        self.assertQuerySetEqual(
+            self.filtered(is_favorited=True, tags=["tag0"]),
+            Favorite.objects.filter(user=self.user).values_list(
+                "recipe_id", flat=True
+            ),
+            transform=lambda recipe: recipe.pk,
+            ordered=False,
+        )
+        self.assertFalse(self.filtered(is_favorited=True, tags=["tag2"]))
+
+    def test_cart_and_author(self):
+        author = self.authors[1]
+        self.assertQuerySetEqual(
+            self.filtered(is_in_shopping_cart=True, author=author.pk),
+            Basket.objects.filter(
+                user=self.user, recipe__author=author
+            ).values_list("recipe_id", flat=True),
+            transform=lambda recipe: recipe.pk,
+            ordered=False,
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN для PostgreSQL")
+class RecipeFilterPlanTests(RecipeDataTestCase):
+    """
+    Каждое сочетание фильтров фронтенда читает таблицы по индексам.
+    Последовательное сканирование выключено: на маленьких тестовых
+    таблицах оно дешевле любого индекса, и план его выбрал бы.
+    """
+
+    def assert_uses_index(self, queryset, *models):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+            for model in models:
+                table = model._meta.db_table
+                indexes = [
+                    name
+                    for name, info in connection.introspection.get_constraints(
+                        cursor, table
+                    ).items()
+                    if info["index"] or info["unique"]
+                ]
+                self.assertNotIn(f"Seq Scan on {table} ", plan)
+                self.assertTrue(
+                    any(index in plan for index in indexes),
+                    f"Индексы {table} не используются:\n{plan}",
+                )
+
+    def test_tags_plan(self):
+        self.assert_uses_index(
+            self.filtered(tags=["tag0", "tag1"]), RecipeTag
+        )
+
+    def test_favorited_and_tags_plan(self):
+        self.assert_uses_index(
+            self.filtered(is_favorited=True, tags=["tag0"]),
+            Favorite,
+            RecipeTag,
+        )
+
+    def test_cart_and_author_plan(self):
+        self.assert_uses_index(
+            self.filtered(
+                is_in_shopping_cart=True, author=self.authors[1].pk
+            ),
+            Basket,
+            Recipe,
+        )
+
+
+class RecipeImageTests(RecipeDataTestCase):
+    """Замена изображения рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = self.settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_set_image_returns_absolute_url(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (4, 4), "red").save(buffer, format="PNG")
+        image = base64.b64encode(buffer.getvalue()).decode()
+        recipe = Recipe.objects.filter(author=self.authors[0]).first()
+        self.client.force_authenticate(self.authors[0])
+
+        response = self.client.patch(
+            f"/api/recipes/{recipe.pk}/image/",
+            {"image": f"data:image/png;base64,{image}"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.json()["image"].startswith("http://testserver/")
+        )
+
+    def test_backfill_thumbnails(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (960, 960), "red").save(buffer, format="PNG")
+        recipe = Recipe.objects.first()
+        recipe.image.save("recipe.png", ContentFile(buffer.getvalue()))
+
+        # Файлов остальных рецептов нет в хранилище: они пропускаются.
+        call_command(
+            "backfill_thumbnails", stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        recipe.refresh_from_db()
+        with recipe.image_thumbnail.open("rb"), Image.open(
+            recipe.image_thumbnail
+        ) as thumbnail:
+            self.assertEqual(thumbnail.size, RECIPE_THUMBNAIL_SIZE)
+        self.assertEqual(
+            Recipe.objects.filter(image_thumbnail="").count(),
+            Recipe.objects.count() - 1,
+        )
@@ -1,28 +1,37 @@
 import short_url
+from django.core.cache import cache
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from registration.utils import LimitPageNumberPagination
+from registration.models import UserSubscription
+from registration.utils import (ConditionalGetMixin, ImageUploadParser,
+                                LimitCursorPagination,
+                                LimitPageNumberPagination)
 
 from . import constants
+from .cache import (get_recipe_fragments, recipes_response_key,
+                    recipes_stamp)
+from .exporters import (EXPORTERS, ExportContentNegotiation,
+                        PDFShoppingListExporter)
+from .feed import FeedPagination
 from .filters import RecipeFilter
+from .jobs import JOB_DONE, JOB_PENDING, create_job, get_job
 from .mixins import delete_file
 from .models import Basket, Favorite, Recipe
 from .permissions import ReadOnlyOrAuthorOrAdmin
 from .serializers import (BasketRecipeSerializer, CRUDRecipeSerializer,
-                          FavoriteRecipeSerializer)
+                          FavoriteRecipeSerializer, RecipeImageSerializer)
 
 
-class CRUDRecipeViewSet(viewsets.ModelViewSet):
+class CRUDRecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """CRUD вьюсет для обработки запросов к recipe/"""
 
     queryset = Recipe.objects.all()
@@ -32,15 +41,232 @@ class CRUDRecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = LimitPageNumberPagination
     http_method_names = ["get", "post", "patch", "delete"]
+    # Поле для файла из ImageUploadParser, задаётся в @action.
+    upload_field = None
 
+    @property
+    def paginator(self):
+        """
+        Пагинатор по номеру страницы, либо keyset-пагинатор
+        при ?pagination=cursor (или наличии параметра cursor).
+        """
+        if not hasattr(self, "_paginator"):
+            query_params = self.request.query_params
+            if (
+                query_params.get(constants.PAGINATION_MODE_PARAM)
+                == constants.CURSOR_PAGINATION_MODE
+                or LimitCursorPagination.cursor_query_param in query_params
+            ):
+                self._paginator = LimitCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    @staticmethod
+    def _with_related(queryset):
+        """
+        Жадная загрузка автора и связей с тэгами и ингредиентами; сами
+        тэги и ингредиенты берутся из кэша каталога при сериализации.
+        """
+        return queryset.select_related("author").prefetch_related(
+            "recipe_tags", "recipe_ingredients"
+        )
+
+    def get_queryset(self):
+        """
+        Рецепты, аннотированные флагами is_favorited/is_in_shopping_cart и
+        подпиской на автора для текущего пользователя.
+        Для списка связанные объекты не загружаются: данные рецептов
+        берутся из кэша фрагментов (см. _list_from_fragments).
+        Количество запросов на страницу не зависит от её размера.
+        """
+        queryset = super().get_queryset()
+        if self.action not in ("list", "feed"):
+            queryset = self._with_related(queryset)
+        user = self.request.user
+
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_author_subscribed=Value(
+                    False, output_field=BooleanField()
+                ),
+            )
+
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                Basket.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_author_subscribed=Exists(
+                UserSubscription.objects.filter(
+                    user=user, subscription=OuterRef("author")
+                )
+            ),
+        )
+
+    def _anonymous_cached(self, handler, request, *args, **kwargs):
+        """
+        Кэширует ответы на GET-запросы анонимных пользователей.
+        Ключ учитывает параметры запроса и версию рецептов (см. cache.py).
+        """
+        if not request.user.is_anonymous:
+            return handler(request, *args, **kwargs)
+
+        key = recipes_response_key(request, kwargs.get("pk"))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, constants.RECIPES_CACHE_TIMEOUT)
+        return response
+
+    def _render_fragments(self, recipe_ids):
+        """Сериализует рецепты, которых нет в кэше фрагментов."""
+        recipes = self._with_related(self.get_queryset()).filter(
+            pk__in=recipe_ids
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return {item["id"]: item for item in serializer.data}
+
+    def _serialize_from_fragments(self, request, recipes):
+        fragments = get_recipe_fragments(
+            request, recipes, self._render_fragments
+        )
+        serializer = self.get_serializer()
+        return [
+            serializer.with_user_flags(recipe, fragment)
+            for recipe, fragment in zip(recipes, fragments)
+        ]
+
+    def _list_from_fragments(self, request, *args, **kwargs):
+        """
+        Список рецептов из закэшированных фрагментов, общих для всех
+        пользователей, с наложением флагов текущего пользователя,
+        полученных аннотациями в запросе страницы.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = list(queryset) if page is None else page
+
+        data = self._serialize_from_fragments(request, recipes)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def get_etag_stamp(self, request, *args, **kwargs):
+        return recipes_stamp(request)
+
+    def get_last_modified(self, request, *args, **kwargs):
+        if "pk" not in kwargs:
+            return None
+        return (
+            Recipe.objects.filter(pk=kwargs["pk"])
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+
+    def _cached_list(self, request, *args, **kwargs):
+        return self._anonymous_cached(
+            self._list_from_fragments, request, *args, **kwargs
+        )
+
+    def _cached_retrieve(self, request, *args, **kwargs):
+        # Обычный retrieve ModelViewSet, минуя ConditionalGetMixin.
+        return self._anonymous_cached(
+            super(ConditionalGetMixin, self).retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self._cached_list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self._cached_retrieve, request, *args, **kwargs
+        )
+
+    def get_serializer_context(self):
+        """В списках вместо картинок отдаются превью."""
+        return {
+            **super().get_serializer_context(),
+            "thumbnails": self.action in ("list", "feed"),
+        }
+
+    def _reload_for_response(self, serializer):
+        """
+        Перечитывает сохранённый рецепт с жадной загрузкой и аннотациями,
+        чтобы ответ строился за постоянное число запросов.
+        """
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        self._reload_for_response(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self._reload_for_response(serializer)
 
     def perform_destroy(self, instance):
         """Удаление изображения из хранилища при удалении рецепта."""
-        if instance.image:
-            delete_file(instance.image.path)
-        super().perform_destroy(instance)
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            delete_file(instance.image)
+            delete_file(instance.image_thumbnail)
+
+    @action(
+        detail=True,
+        methods=("PATCH",),
+        url_path="image",
+        parser_classes=(JSONParser, MultiPartParser, ImageUploadParser),
+        upload_field="image",
+    )
+    def set_image(self, request, pk=None):
+        """
+        Замена изображения рецепта: Base64 (JSON), файл в
+        multipart/form-data или тело запроса с Content-Type: image/*.
+        """
+        serializer = RecipeImageSerializer(
+            self.get_object(),
+            data=request.data,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    def _feed(self, request, *args, **kwargs):
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_feed(request, request.user)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        data = self._serialize_from_fragments(
+            request, [recipes[pk] for pk in recipe_ids if pk in recipes]
+        )
+        return paginator.get_paginated_response(data)
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        url_path="feed",
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь,
+        от новых к старым. Keyset-пагинация: ?limit= и ссылка next.
+        """
+        return self.conditional(self._feed, request)
 
     @action(detail=True, methods=("GET",), url_path="get-link")
     def get_link(self, request, pk=None):
@@ -54,8 +280,8 @@ class CRUDRecipeViewSet(viewsets.ModelViewSet):
 
         return Response({"short-link": short_link}, status=status.HTTP_200_OK)
 
-    def _handle_add_to_list(self, request, pk, model,
-                            serializer_class, error_message):
+    def _handle_add_to_list(self, request, pk, model, serializer_class,
+                            error_message):
         """Добавление рецепта в избранное/корзину"""
         recipe = get_object_or_404(Recipe, pk=pk)
 
@@ -130,59 +356,84 @@ class CRUDRecipeViewSet(viewsets.ModelViewSet):
             "Рецепт с id-{recipe_id} не найден в корзине пользователя",
         )
 
-    @action(detail=False, methods=("GET",), url_path="download_shopping_cart")
+    @action(
+        detail=False,
+        methods=("GET",),
+        url_path="download_shopping_cart",
+        permission_classes=(IsAuthenticated,),
+        content_negotiation_class=ExportContentNegotiation,
+    )
     def download_shopping_cart(self, request):
         """
-        Метод для скачивания списка рецептов,
-        в корзине пользователя в формате PDF
+        Метод для скачивания списка ингредиентов рецептов,
+        в корзине пользователя: ?format=pdf|csv|txt|json (по умолчанию pdf).
         """
-        shopping_cart_recipes = request.user.shopping_carts.prefetch_related(
-            "recipe_ingredients__ingredient"
-        )
-
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = (
-            'attachment; filename="shopping_cart.pdf"'
+        export_format = request.query_params.get(
+            constants.EXPORT_FORMAT_PARAM, constants.DEFAULT_EXPORT_FORMAT
         )
+        exporter_class = EXPORTERS.get(export_format)
+        if exporter_class is None:
+            return Response(
+                {
+                    constants.EXPORT_FORMAT_PARAM: (
+                        f"Неизвестный формат {export_format}, доступны: "
+                        f"{', '.join(EXPORTERS)}"
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        page = canvas.Canvas(response, pagesize=A4)
+        return exporter_class(request.user).cached_response(request)
 
-        pdfmetrics.registerFont(TTFont("FreeSerif", "FreeSerif.ttf"))
-        page.setFont("FreeSerif", constants.HEADER_SIZE)
-        page.drawString(
-            constants.COORDINAT_X_TITLE,
-            constants.COORDINAT_Y_TITLE,
-            f"""Корзина покупок ингредиентов,
-            пользователя {request.user.username}""",
+    @action(
+        detail=False,
+        methods=("POST",),
+        url_path="download_shopping_cart/jobs",
+        permission_classes=(IsAuthenticated,),
+    )
+    def create_shopping_cart_job(self, request):
+        """
+        Ставит рендеринг PDF списка покупок в фоновую очередь,
+        возвращает id задачи для опроса статуса.
+        """
+        job_id, job = create_job(request.user)
+        return Response(
+            {
+                "id": job_id,
+                "status": job["status"],
+                "url": self.reverse_action(
+                    self.get_shopping_cart_job.url_name,
+                    kwargs={"job_id": job_id},
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
-        page.setFont("FreeSerif", constants.ROW_SIZE)
-
-        ingredients_with_weight = {}
-
-        for recipe in shopping_cart_recipes:
-            for recipe_ingredient in recipe.recipe_ingredients.all():
-                ingredient_name = recipe_ingredient.ingredient.name
-                measurement_unit = (recipe_ingredient
-                                    .ingredient.measurement_unit)
-                key = f"{ingredient_name}({measurement_unit})"
-                ingredients_with_weight[key] = (
-                    ingredients_with_weight.get(key, 0)
-                    + recipe_ingredient.amount
-                )
-
-        x_row, y_row = constants.COORDINAT_X_ROW, constants.COORDINAT_Y_ROW
-        for name_measure, total_amount in ingredients_with_weight.items():
-            page.drawString(x_row, y_row, f"* {name_measure} - {total_amount}")
-            y_row -= constants.LINE_INDENTATION
 
-            if y_row <= constants.PAGE_MISSING:
-                page.showPage()
-                page.setFont("FreeSerif", constants.ROW_SIZE)
-                y_row = (
-                    constants.COORDINAT_Y_TITLE - constants.COORDINAT_Y_ROW
-                ) + constants.COORDINAT_Y_ROW
+    @action(
+        detail=False,
+        methods=("GET",),
+        url_path=r"download_shopping_cart/jobs/(?P<job_id>[0-9a-f]{32})",
+        url_name="shopping-cart-job",
+        permission_classes=(IsAuthenticated,),
+    )
+    def get_shopping_cart_job(self, request, job_id=None):
+        """Статус задачи экспорта или готовый PDF."""
+        job = get_job(job_id, request.user)
+        if job is None:
+            raise Http404
 
-        page.showPage()
-        page.save()
+        if job["status"] == JOB_DONE:
+            exporter = PDFShoppingListExporter(request.user)
+            if "content" not in job:
+                # Слишком большой для кэша файл рендерится заново.
+                return exporter.response()
+            return exporter.response([job["content"]])
 
-        return response
+        return Response(
+            {"id": job_id, "status": job["status"]},
+            status=(
+                status.HTTP_202_ACCEPTED
+                if job["status"] == JOB_PENDING
+                else status.HTTP_500_INTERNAL_SERVER_ERROR
+            ),
+        )
@@ -12,7 +12,9 @@ class UserSubscriptionInline(admin.TabularInline):
 
 class BaseUserAdmin(UserAdmin):
     model = BaseUser
-    list_display = ("username", "email", "role")
+    list_display = (
+        "username", "email", "role", "subscribers_count", "recipes_count"
+    )
     search_fields = ("username", "email")
     inlines = [UserSubscriptionInline]
 
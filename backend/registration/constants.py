@@ -1,3 +1,10 @@
 USERS_PAGE_SIZE = 10
 LENGTH_NAME_USER = 150
 LENGTH_EMAIL_USER = 254
+
+# Обработка загружаемых изображений
+IMAGE_MAX_SIZE = 1920
+IMAGE_QUALITY = 85
+AVATAR_THUMBNAIL_SIZE = (128, 128)
+# Base64 декодируется порциями такой длины (кратна 4)
+BASE64_CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("registration", "0006_alter_baseuser_managers_alter_baseuser_avatar_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="baseuser",
+            name="recipes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Recipes count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="baseuser",
+            name="subscribers_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Subscribers count"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("registration", "0007_baseuser_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="baseuser",
+            name="avatar_thumbnail",
+            field=models.ImageField(
+                blank=True,
+                help_text="Превью аватара для списков",
+                upload_to="users/thumbnails/",
+                verbose_name="Avatar thumbnail",
+            ),
+        ),
+    ]
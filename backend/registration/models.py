@@ -3,13 +3,26 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from foodgram.mixins import DenormalizedFieldsMixin, TrackedFieldsMixin
+
 from .constants import LENGTH_EMAIL_USER, LENGTH_NAME_USER
 from .managers import CustomBaseUserManager
 
 
-class BaseUser(AbstractUser):
+class BaseUser(DenormalizedFieldsMixin, TrackedFieldsMixin, AbstractUser):
     """Базовая модель пользователя"""
 
+    denormalized_fields = ("subscribers_count", "recipes_count")
+    # Поля профиля, которые попадают в ответы API.
+    tracked_fields = (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "avatar",
+        "avatar_thumbnail",
+    )
+
     class Roles(models.TextChoices):
         USER = "user", "Пользователь"
         ADMIN = "admin", "Администратор"
@@ -60,6 +73,13 @@ class BaseUser(AbstractUser):
         upload_to="users/",
     )
 
+    avatar_thumbnail = models.ImageField(
+        blank=True,
+        help_text="Превью аватара для списков",
+        verbose_name="Avatar thumbnail",
+        upload_to="users/thumbnails/",
+    )
+
     subscription = models.ManyToManyField(
         to="self",
         db_index=True,
@@ -67,6 +87,18 @@ class BaseUser(AbstractUser):
         verbose_name="User subscriptions",
     )
 
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name="Subscribers count",
+        default=0,
+        editable=False,
+    )
+
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Recipes count",
+        default=0,
+        editable=False,
+    )
+
     objects = CustomBaseUserManager()
 
     @property
@@ -2,9 +2,12 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
-from recipe.mixins import RolledUpRecipeSerializer
+from recipe.mixins import (RolledUpRecipeSerializer, delete_file,
+                           parse_recipes_limit)
+from registration.constants import AVATAR_THUMBNAIL_SIZE
 from registration.models import BaseUser
-from registration.utils import Base64ImageField
+from registration.utils import (Base64ImageField, make_thumbnail,
+                                request_subscriptions)
 
 
 class AvatarProfileSerializer(serializers.ModelSerializer):
@@ -21,10 +24,17 @@ class AvatarProfileSerializer(serializers.ModelSerializer):
         Если у пользователя уже есть аватар и он обновляет его,
         удаляем старый файл
         """
-        if instance.avatar and validated_data.get("avatar"):
-            instance.avatar.delete(save=False)
+        old_files = (instance.avatar, instance.avatar_thumbnail)
+        if validated_data.get("avatar"):
+            validated_data["avatar_thumbnail"] = make_thumbnail(
+                validated_data["avatar"], AVATAR_THUMBNAIL_SIZE
+            )
+        instance = super().update(instance, validated_data)
 
-        return super().update(instance, validated_data)
+        if validated_data.get("avatar"):
+            for file in old_files:
+                delete_file(file)
+        return instance
 
 
 class CreateProfileSerializer(serializers.ModelSerializer):
@@ -56,10 +66,27 @@ class CreateProfileSerializer(serializers.ModelSerializer):
         return user
 
 
+class ProfileListSerializer(serializers.ListSerializer):
+    """Проверяет подписки на всех пользователей страницы одним запросом."""
+
+    def to_representation(self, data):
+        request = self.context.get("request")
+        users = list(data.all() if hasattr(data, "all") else data)
+        if request is not None:
+            request_subscriptions(request).load(
+                user.pk for user in users
+                if not hasattr(user, "is_subscribed")
+            )
+        return super().to_representation(users)
+
+
 class FullProfileSerializer(CreateProfileSerializer):
     """Серилизатор для полных данных о пользователе"""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar = Base64ImageField(
+        read_only=True, thumbnail_field="avatar_thumbnail"
+    )
 
     class Meta:
         model = BaseUser
@@ -72,21 +99,22 @@ class FullProfileSerializer(CreateProfileSerializer):
             "is_subscribed",
             "avatar",
         )
+        list_serializer_class = ProfileListSerializer
 
     def get_is_subscribed(self, obj):
         """
         Метод проверяющий подписку пользователя сделавшего запрос, на
         пользователя в качестве obj.
+        Если флаг уже вычислен в queryset (is_subscribed), запрос не нужен,
+        иначе используется общий для запроса SubscriptionSet.
         """
-        current_user = self.context["request"].user
-        if (
-            current_user.is_authenticated
-            and current_user.subscription.all()
-            .filter(id=obj.id)
-        ):
-            return True
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
 
-        return False
+        request = self.context.get("request")
+        if request is None:
+            return False
+        return obj.pk in request_subscriptions(request)
 
 
 class ResetPasswordUser(serializers.Serializer):
@@ -153,13 +181,24 @@ class SubscriptionProfileSerializer(FullProfileSerializer):
         )
 
     def get_recipes(self, obj):
-        recipes = obj.author_recipes.all()  # Получаем все рецепты пользователя
-        recipes_limit = self.context.get("recipes_limit")
-
-        if recipes_limit and int(recipes_limit) > 0:
-            recipes = recipes[: int(recipes_limit)]
+        """
+        Рецепты, загруженные author_recipes_prefetch, или запрос
+        к рецептам автора, если prefetch не выполнялся.
+        """
+        recipes = getattr(obj, "limited_recipes", None)
+        if recipes is None:
+            recipes = obj.author_recipes.all()
+            recipes_limit = parse_recipes_limit(
+                self.context.get("recipes_limit")
+            )
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
 
         return RolledUpRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.author_recipes.count()
+        """Число рецептов из аннотации recipes_total или запросом."""
+        recipes_total = getattr(obj, "recipes_total", None)
+        if recipes_total is None:
+            return obj.author_recipes.count()
+        return recipes_total
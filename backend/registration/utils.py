@@ -1,20 +1,165 @@
 import base64
+import hashlib
+import io
+import json
 
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from PIL import Image, ImageOps
 from rest_framework import serializers
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.parsers import DataAndFiles, FileUploadParser
 
 from . import constants
+from .models import UserSubscription
+
+
+def _encode_image(image, name):
+    """
+    Перекодирует изображение в JPEG. Метаданные (EXIF и пр.) не
+    переносятся, прозрачность заливается белым фоном.
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        "JPEG",
+        quality=constants.IMAGE_QUALITY,
+        optimize=True,
+        progressive=True,
+    )
+    return ContentFile(buffer.getvalue(), name=f"{name}.jpg")
+
+
+def _open_image(file, size):
+    file.seek(0)
+    image = Image.open(file)
+    # JPEG декодируется сразу в уменьшенном виде (1/2 - 1/8).
+    side = max(size)
+    image.draft("RGB", (side, side))
+    # Поворот из EXIF применяется до удаления метаданных.
+    return ImageOps.exif_transpose(image)
+
+
+def process_image(file, max_size=constants.IMAGE_MAX_SIZE):
+    """Ограничивает размеры изображения и перекодирует его."""
+    image = _open_image(file, (max_size, max_size))
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    return _encode_image(image, "image")
+
+
+def make_thumbnail(file, size):
+    """Превью фиксированного размера size=(ширина, высота)."""
+    image = ImageOps.fit(_open_image(file, size), size, Image.LANCZOS)
+    return _encode_image(image, "thumbnail")
+
+
+def decode_base64_image(data):
+    """
+    Декодирует data URI (data:image/<ext>;base64,...) в загруженный файл.
+    Строка декодируется порциями без промежуточных копий; большие
+    изображения, как и при multipart-загрузке, пишутся во временный файл
+    (порог FILE_UPLOAD_MAX_MEMORY_SIZE).
+    """
+    header, separator, _ = data[:100].partition(";base64,")
+    if not separator:
+        raise ValueError("Not a base64 data URI")
+    content_type = header[len("data:"):]
+    name = "image." + content_type.split("/")[-1]
+    start = len(header) + len(separator)
+
+    if (len(data) - start) * 3 // 4 > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        file = TemporaryUploadedFile(name, content_type, 0, None)
+    else:
+        file = InMemoryUploadedFile(
+            io.BytesIO(), None, name, content_type, 0, None
+        )
+
+    tail = ""
+    for offset in range(start, len(data), constants.BASE64_CHUNK_SIZE):
+        chunk = tail + "".join(
+            data[offset:offset + constants.BASE64_CHUNK_SIZE].split()
+        )
+        end = len(chunk) - len(chunk) % 4
+        file.write(base64.b64decode(chunk[:end]))
+        tail = chunk[end:]
+    if tail:
+        file.close()
+        raise ValueError("Incorrect base64 padding")
+
+    file.size = file.tell()
+    file.seek(0)
+    return file
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Изображение в теле запроса как есть (Content-Type: image/*).
+    Файл попадает в поле upload_field действия (по умолчанию file),
+    имя файла необязательно.
+    """
+
+    media_type = "image/*"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        files = super().parse(stream, media_type, parser_context).files
+        field = getattr(parser_context["view"], "upload_field", None)
+        field = field or "file"
+        return DataAndFiles({}, {field: files["file"]})
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(
+            stream, media_type, parser_context
+        ) or "image." + media_type.split(";")[0].split("/")[-1]
 
 
 class Base64ImageField(serializers.ImageField):
+    """
+    Изображение в Base64 (data URI) или файлом (multipart/form-data,
+    ImageUploadParser). Загруженный файл уменьшается и перекодируется
+    (см. process_image). При чтении вместо изображения отдаётся превью
+    из поля модели thumbnail_field, если в контексте thumbnails=True
+    (списки) или задано thumbnail_by_default.
+    """
+
+    def __init__(self, *args, thumbnail_field=None,
+                 thumbnail_by_default=False, **kwargs):
+        self.thumbnail_field = thumbnail_field
+        self.thumbnail_by_default = thumbnail_by_default
+        super().__init__(*args, **kwargs)
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="image." + ext)
+            try:
+                data = decode_base64_image(data)
+            except ValueError:
+                self.fail("invalid_image")
+            try:
+                return process_image(super().to_internal_value(data))
+            finally:
+                data.close()
+
+        return process_image(super().to_internal_value(data))
 
-        return super().to_internal_value(data)
+    def to_representation(self, value):
+        if (
+            value
+            and self.thumbnail_field
+            and self.context.get("thumbnails", self.thumbnail_by_default)
+        ):
+            thumbnail = getattr(value.instance, self.thumbnail_field)
+            if thumbnail:
+                value = thumbnail
+        return super().to_representation(value)
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -25,3 +170,109 @@ class LimitPageNumberPagination(PageNumberPagination):
 
     page_size_query_param = "limit"
     page_size = constants.USERS_PAGE_SIZE
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Keyset-пагинатор по (pub_date, id), совпадает с Recipe.Meta.ordering.
+    Не выполняет COUNT(*) и OFFSET, поэтому время ответа не зависит от
+    глубины страницы. Поддерживает параметр limit, как и
+    LimitPageNumberPagination; в ответе поля next, previous, results.
+    """
+
+    page_size_query_param = "limit"
+    page_size = constants.USERS_PAGE_SIZE
+    ordering = ("-pub_date", "-id")
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag) для list/retrieve.
+    ETag строится из дешёвой метки версии get_etag_stamp(), без
+    сериализации ответа: при совпадении с If-None-Match сразу
+    возвращается 304. Метка включает путь с параметрами и пользователя.
+    """
+
+    def get_etag_stamp(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """Необязательная дата изменения для заголовка Last-Modified."""
+        return None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        raw_etag = json.dumps(
+            [
+                self.get_etag_stamp(request, *args, **kwargs),
+                request.get_full_path(),
+                request.user.pk,
+            ]
+        )
+        etag = quote_etag(hashlib.md5(raw_etag.encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            last_modified = self.get_last_modified(request, *args, **kwargs)
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(
+                    last_modified.timestamp()
+                )
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class SubscriptionSet:
+    """
+    Подписки пользователя запроса для полей is_subscribed.
+    Загружаются лениво и только для нужных id: load() проверяет одним
+    запросом всю страницу, повторные проверки запросов не выполняют.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.ids = set()
+        self.checked = set()
+
+    def load(self, ids):
+        missing = set(ids) - self.checked
+        if not missing:
+            return
+        if self.user.is_authenticated:
+            self.ids.update(
+                UserSubscription.objects.filter(
+                    user=self.user, subscription_id__in=missing
+                ).values_list("subscription_id", flat=True)
+            )
+        self.checked |= missing
+
+    def __contains__(self, pk):
+        if pk == self.user.pk:
+            return False
+        self.load((pk,))
+        return pk in self.ids
+
+    def add(self, pk):
+        self.ids.add(pk)
+        self.checked.add(pk)
+
+    def discard(self, pk):
+        self.ids.discard(pk)
+        self.checked.add(pk)
+
+
+def request_subscriptions(request):
+    """SubscriptionSet, общий для всех сериализаторов одного запроса."""
+    if not hasattr(request, "subscriptions"):
+        request.subscriptions = SubscriptionSet(request.user)
+    return request.subscriptions
@@ -1,19 +1,26 @@
+from django.db import transaction
+from django.db.models import BooleanField, Count, Value
 from django.shortcuts import get_object_or_404
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from recipe.mixins import delete_file
+from recipe.cache import users_stamp
+from recipe.mixins import author_recipes_prefetch, delete_file
 from registration.models import BaseUser, UserSubscription
 from registration.serializers import (AvatarProfileSerializer,
                                       CreateProfileSerializer,
                                       FullProfileSerializer, ResetPasswordUser,
                                       SubscriptionProfileSerializer)
-from registration.utils import LimitPageNumberPagination
+from registration.utils import (ConditionalGetMixin, ImageUploadParser,
+                                LimitPageNumberPagination,
+                                request_subscriptions)
 
 
 class ProfileViewSet(
+    ConditionalGetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -24,6 +31,8 @@ class ProfileViewSet(
     queryset = BaseUser.objects.all()
     permission_classes = (IsAuthenticated,)
     pagination_class = LimitPageNumberPagination
+    # Поле для файла из ImageUploadParser, задаётся в @action.
+    upload_field = None
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -31,6 +40,16 @@ class ProfileViewSet(
 
         return FullProfileSerializer
 
+    def get_serializer_context(self):
+        """В списках вместо аватаров отдаются превью."""
+        return {
+            **super().get_serializer_context(),
+            "thumbnails": self.action in ("list", "list_subscriptions"),
+        }
+
+    def get_etag_stamp(self, request, *args, **kwargs):
+        return users_stamp(request)
+
     def get_permissions(self):
         if self.action in ("create", "retrieve", "list"):
             return (AllowAny(),)
@@ -50,8 +69,18 @@ class ProfileViewSet(
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
-    @action(detail=False, methods=("PUT",), url_path="me/avatar")
+    @action(
+        detail=False,
+        methods=("PUT",),
+        url_path="me/avatar",
+        parser_classes=(JSONParser, MultiPartParser, ImageUploadParser),
+        upload_field="avatar",
+    )
     def set_avatar_profile(self, request):
+        """
+        Аватар в Base64 (JSON), файлом в multipart/form-data или
+        телом запроса с Content-Type: image/*.
+        """
         user = request.user
         serializer = AvatarProfileSerializer(user, data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -62,9 +91,12 @@ class ProfileViewSet(
     def remove_avatar_profile(self, request):
         user = request.user
         if user.avatar:
-            delete_file(user.avatar.path)
+            avatar, thumbnail = user.avatar, user.avatar_thumbnail
             user.avatar = None
+            user.avatar_thumbnail = None
             user.save()
+            delete_file(avatar)
+            delete_file(thumbnail)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=("GET",), url_path="subscriptions")
@@ -73,9 +105,12 @@ class ProfileViewSet(
         Метод GET, для получения списка пользователей,
         на которых подписан текущий пользователь
         """
-        subscriptions = request.user.subscription.all()
-        page = self.paginate_queryset(subscriptions)
         recipes_limit = request.query_params.get("recipes_limit")
+        subscriptions = request.user.subscription.annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+            recipes_total=Count("author_recipes"),
+        ).prefetch_related(author_recipes_prefetch(recipes_limit))
+        page = self.paginate_queryset(subscriptions)
 
         if page is not None:
             serializer = SubscriptionProfileSerializer(
@@ -109,16 +144,19 @@ class ProfileViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        subscription, created = UserSubscription.objects.get_or_create(
-            user=request.user, subscription=to_subscribe_user
-        )
-
-        if not created:
-            return Response(
-                {"error": "Вы уже подписаны на этого пользователя."},
-                status=status.HTTP_400_BAD_REQUEST,
+        with transaction.atomic():
+            subscription, created = UserSubscription.objects.get_or_create(
+                user=request.user, subscription=to_subscribe_user
             )
 
+            if not created:
+                return Response(
+                    {"error": "Вы уже подписаны на этого пользователя."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            request_subscriptions(request).add(to_subscribe_user.pk)
+            to_subscribe_user.refresh_from_db(fields=("subscribers_count",))
+
         serializer = SubscriptionProfileSerializer(
             to_subscribe_user,
             context={
@@ -144,6 +182,8 @@ class ProfileViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        subscription.delete()
+        with transaction.atomic():
+            subscription.delete()
+            request_subscriptions(request).discard(to_unsubscribe_user.pk)
 
         return Response(status=status.HTTP_204_NO_CONTENT)